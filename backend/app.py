@@ -6,16 +6,20 @@ from config import Config
 from db import init_db
 from services.rate_limit import init_redis
 from utils.errors import error_response
+from utils.json_provider import FastJSONProvider
 
 from routes.places import bp as places_bp
 from routes.interactions import bp as interactions_bp
 from routes.safety import bp as safety_bp
 from routes.moderation import bp as moderation_bp
+from routes.tiles import bp as tiles_bp
+from routes.anchors import bp as anchors_bp
 
 
 def create_app():
     load_dotenv()
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
 
     CORS(app, origins=app.config.get("CORS_ORIGINS", ["http://localhost:3000"]))
@@ -27,6 +31,8 @@ def create_app():
     app.register_blueprint(interactions_bp, url_prefix="/v1")
     app.register_blueprint(safety_bp, url_prefix="/v1")
     app.register_blueprint(moderation_bp, url_prefix="/v1")
+    app.register_blueprint(tiles_bp, url_prefix="/v1")
+    app.register_blueprint(anchors_bp, url_prefix="/v1")
 
     register_error_handlers(app)
     return app
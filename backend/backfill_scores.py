@@ -0,0 +1,12 @@
+"""Give places written before score decay an upvote weight: python backfill_scores.py
+
+Safe to run more than once; places that already have a weight are skipped.
+"""
+
+from app import app
+from services.upvotes import backfill_upvote_weights
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        print(f"Backfilled {backfill_upvote_weights()} places")
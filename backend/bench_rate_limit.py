@@ -0,0 +1,71 @@
+"""Compare fixed and sliding rate-limit windows on a real Redis.
+
+    REDIS_URL=redis://localhost:6379/15 python bench_rate_limit.py
+
+Reports Redis commands (including those run inside the script) per request,
+wall time per request, and counter memory per active fingerprint. All
+requests land in one window; a sliding limiter also keeps the previous
+window's counter alive, so in steady state it holds about twice the memory
+shown. Uses FLUSHDB, so point it at a scratch database.
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+import redis
+
+from services import rate_limit
+
+
+FINGERPRINTS = 2000
+REQUESTS_PER_FINGERPRINT = 5
+LIMIT = 10
+WINDOW_SEC = 3600
+
+
+def _command_calls(client):
+    stats = client.info("commandstats")
+    return sum(entry["calls"] for entry in stats.values())
+
+
+def _counter_memory(client):
+    return sum(client.memory_usage(key) or 0 for key in client.scan_iter("rate:*"))
+
+
+def run(strategy, client):
+    client.flushdb()
+    requests = FINGERPRINTS * REQUESTS_PER_FINGERPRINT
+    calls_before = _command_calls(client)
+    started = time.perf_counter()
+    for i in range(requests):
+        rate_limit.acquire_write_slot(
+            f"bench:{i % FINGERPRINTS}", LIMIT, WINDOW_SEC, strategy=strategy
+        )
+    elapsed = time.perf_counter() - started
+    # The two INFO calls bracketing the run count themselves once.
+    calls = _command_calls(client) - calls_before - 1
+    return {
+        "commands_per_request": calls / requests,
+        "us_per_request": elapsed / requests * 1e6,
+        "bytes_per_fingerprint": _counter_memory(client) / FINGERPRINTS,
+    }
+
+
+def main():
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+    rate_limit.init_redis(SimpleNamespace(config={"REDIS_URL": url}))
+    client = redis.Redis.from_url(url, decode_responses=True)
+    for strategy in rate_limit.RATE_LIMIT_STRATEGIES:
+        result = run(strategy, client)
+        print(
+            f"{strategy:8} "
+            f"{result['commands_per_request']:.2f} cmds/req  "
+            f"{result['us_per_request']:.0f} us/req  "
+            f"{result['bytes_per_fingerprint']:.0f} B/fingerprint"
+        )
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,48 @@ class Config:
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com")
     SOLANA_KEYPAIR_PATH = os.getenv("SOLANA_KEYPAIR_PATH")
+    SOLANA_RPC_TIMEOUT_SEC = float(os.getenv("SOLANA_RPC_TIMEOUT_SEC", "10"))
+    SOLANA_BLOCKHASH_TTL_SEC = float(os.getenv("SOLANA_BLOCKHASH_TTL_SEC", "20"))
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 
     RATE_LIMIT_SUBMIT_PER_HOUR = int(os.getenv("RATE_LIMIT_SUBMIT_PER_HOUR", "5"))
     RATE_LIMIT_UPVOTE_PER_HOUR = int(os.getenv("RATE_LIMIT_UPVOTE_PER_HOUR", "10"))
     RATE_LIMIT_WINDOW_SEC = int(os.getenv("RATE_LIMIT_WINDOW_SEC", "3600"))
+    # "sliding" or "fixed", per limiter.
+    RATE_LIMIT_SUBMIT_STRATEGY = os.getenv("RATE_LIMIT_SUBMIT_STRATEGY", "sliding")
+    RATE_LIMIT_UPVOTE_STRATEGY = os.getenv("RATE_LIMIT_UPVOTE_STRATEGY", "sliding")
+
+    ANCHOR_POLL_INTERVAL_SEC = float(os.getenv("ANCHOR_POLL_INTERVAL_SEC", "1"))
+    ANCHOR_LEASE_SEC = int(os.getenv("ANCHOR_LEASE_SEC", "120"))
+    ANCHOR_MAX_ATTEMPTS = int(os.getenv("ANCHOR_MAX_ATTEMPTS", "8"))
+    ANCHOR_RETRY_BASE_SEC = int(os.getenv("ANCHOR_RETRY_BASE_SEC", "5"))
+    ANCHOR_BATCH_UPVOTES = os.getenv("ANCHOR_BATCH_UPVOTES", "false").lower() == "true"
+    ANCHOR_BATCH_MAX_SIZE = int(os.getenv("ANCHOR_BATCH_MAX_SIZE", "256"))
+    ANCHOR_BATCH_WINDOW_SEC = int(os.getenv("ANCHOR_BATCH_WINDOW_SEC", "30"))
+    # How often the worker looks for submissions whose outbox entry was never
+    # written, and how old a submission must be before it counts as one.
+    ANCHOR_SWEEP_INTERVAL_SEC = float(os.getenv("ANCHOR_SWEEP_INTERVAL_SEC", "60"))
+    ANCHOR_SWEEP_GRACE_SEC = int(os.getenv("ANCHOR_SWEEP_GRACE_SEC", "60"))
+
+    SAFETY_SCORE_HALF_LIFE_DAYS = float(os.getenv("SAFETY_SCORE_HALF_LIFE_DAYS", "30"))
+
+    UPVOTE_WRITE_BEHIND = os.getenv("UPVOTE_WRITE_BEHIND", "false").lower() == "true"
+    UPVOTE_FLUSH_INTERVAL_SEC = float(os.getenv("UPVOTE_FLUSH_INTERVAL_SEC", "2"))
+
+    PLACES_CACHE_TTL_SEC = int(os.getenv("PLACES_CACHE_TTL_SEC", "30"))
+    # Finest viewport cache cell; wider radii pick coarser cells themselves.
+    PLACES_CACHE_GEOHASH_PRECISION = int(os.getenv("PLACES_CACHE_GEOHASH_PRECISION", "6"))
+    # Viewports around more places than this skip the cache and query exactly.
+    PLACES_CACHE_MAX_ROWS = int(os.getenv("PLACES_CACHE_MAX_ROWS", "2000"))
+    PLACES_MAX_AGE_SEC = int(os.getenv("PLACES_MAX_AGE_SEC", "10"))
+
+    CLUSTER_INDEX_MAX_AGE_SEC = int(os.getenv("CLUSTER_INDEX_MAX_AGE_SEC", "300"))
+    TILES_CACHE_TTL_SEC = int(os.getenv("TILES_CACHE_TTL_SEC", "300"))
+    TILES_MAX_AGE_SEC = int(os.getenv("TILES_MAX_AGE_SEC", "60"))
+
+    # The pending-submission counter is recounted from Mongo once it expires,
+    # so any drift lasts at most this long.
+    MODERATION_COUNT_TTL_SEC = int(os.getenv("MODERATION_COUNT_TTL_SEC", "300"))
+    MODERATION_QUEUE_MAX_LIMIT = int(os.getenv("MODERATION_QUEUE_MAX_LIMIT", "100"))
+
+    SPATIAL_SNAPSHOT_ENABLED = os.getenv("SPATIAL_SNAPSHOT_ENABLED", "false").lower() == "true"
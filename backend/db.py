@@ -1,4 +1,5 @@
 from mongoengine import connect
+from pymongo.errors import OperationFailure
 
 
 def init_db(app):
@@ -12,3 +13,24 @@ def init_db(app):
         host=mongo_uri,
         uuidRepresentation="standard",
     )
+
+
+def drop_stale_geo_indexes(*documents):
+    """Drop 2dsphere indexes the models no longer declare.
+
+    $geoNear refuses to run while a collection has two 2dsphere indexes, and
+    mongoengine creates a newly declared one on first use without removing
+    the old, so migrate.py runs this before the API and worker start.
+    Other stale indexes are harmless and left to sync_indexes.py.
+    """
+    for document in documents:
+        declared = [list(spec["fields"]) for spec in document._meta["index_specs"]]
+        collection = document._get_db()[document._get_collection_name()]
+        for name, info in collection.index_information().items():
+            key = list(info["key"])
+            if any(kind == "2dsphere" for _, kind in key) and key not in declared:
+                try:
+                    collection.drop_index(name)
+                except OperationFailure:
+                    # Another worker starting up dropped it first.
+                    pass
@@ -0,0 +1,19 @@
+"""Prepare the database before the API or worker starts: python migrate.py
+
+The Docker image runs this ahead of gunicorn, and worker.py runs it itself.
+Kept out of app startup so importing the app never needs a reachable Mongo.
+"""
+
+from app import app
+from db import drop_stale_geo_indexes
+from models import Place
+
+
+def migrate():
+    drop_stale_geo_indexes(Place)
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrate()
+        print("Database ready")
@@ -9,7 +9,27 @@ from mongoengine import (
     IntField,
     DateTimeField,
     ListField,
-    DictField
+    DictField,
+    ObjectIdField,
+)
+
+
+# Place fields every list query projects down to.
+SUMMARY_FIELDS = (
+    "transaction_id",
+    "name",
+    "location",
+    "place_type",
+    "category",
+    "safety_score",
+    "upvote_count",
+    "upvote_weight",
+    "upvote_weight_at",
+    "status",
+    "created_at",
+    "movements",
+    "significance",
+    "still_exists",
 )
 
 
@@ -96,6 +116,13 @@ class Place(Document):
     status = StringField(choices=["pending", "approved", "rejected"], default="pending")
     upvote_count = IntField(default=0)
     safety_score = FloatField(default=0)
+    # Upvotes decayed by SAFETY_SCORE_HALF_LIFE_DAYS, exact as of
+    # upvote_weight_at; safety_score is computed from it.
+    upvote_weight = FloatField()
+    upvote_weight_at = DateTimeField()
+    # Last write-behind flush applied to this place, so a flush retried after
+    # a crash can't add the same upvotes twice.
+    upvote_flush_id = StringField()
 
     # Optional/Detail fields
     description = StringField(max_length=2000)
@@ -123,12 +150,91 @@ class Place(Document):
     # Optional tracking of upvotes (used for audits; primary dedupe uses Redis)
     upvoted_by = ListField(StringField())
 
+    # Set while the submission memo waits in the anchor outbox; documents
+    # written before the outbox existed have no value and are anchored.
+    anchoring_status = StringField(choices=["pending", "anchored", "failed"])
+
     meta = {
         "collection": "places",
+        # The only 2dsphere index, as $geoNear needs exactly one; its trailing
+        # keys let the status/type/category filters of map queries be checked
+        # in the index instead of against fetched documents.
         "indexes": [
-            {"fields": [("location", "2dsphere")]},
+            {
+                "fields": [
+                    ("location", "2dsphere"),
+                    ("status", 1),
+                    ("place_type", 1),
+                    ("category", 1),
+                ]
+            },
+            {"fields": ["status", "-created_at", "-id"]},
             {"fields": ["movements"]},
             {"fields": ["community_tags"]},
             {"fields": ["significance"]},
+            # Only submissions still waiting on the chain, for the worker's
+            # sweep of ones whose outbox entry never landed.
+            {
+                "fields": ["created_at"],
+                "name": "anchoring_pending_created_at",
+                "partialFilterExpression": {"anchoring_status": "pending"},
+            },
         ]
     }
+
+
+# -----------------------------
+# Solana anchor outbox
+# -----------------------------
+class AnchorOutbox(Document):
+    """A memo waiting to be written to Solana by the anchoring worker."""
+
+    kind = StringField(required=True, choices=["submit", "upvote"])
+    place_id = ObjectIdField(required=True)
+    memo = StringField(required=True)
+    status = StringField(choices=["pending", "sent", "failed"], default="pending")
+    attempts = IntField(default=0)
+    locked_until = DateTimeField()
+    last_error = StringField()
+    signature = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    sent_at = DateTimeField()
+
+    # Set when the memo was anchored as one leaf of a Merkle batch.
+    batch_id = ObjectIdField()
+    merkle_root = StringField()
+    proof = ListField(DictField())
+
+    meta = {
+        "collection": "anchor_outbox",
+        "indexes": [
+            {"fields": ["status", "locked_until", "created_at"]},
+            {"fields": ["kind", "status", "created_at"]},
+            {"fields": ["batch_id"], "sparse": True},
+            {"fields": ["merkle_root"], "sparse": True},
+        ]
+    }
+
+
+# -----------------------------
+# Safety score grid
+# -----------------------------
+class SafetyCell(Document):
+    """Place count and upvote total of one geohash cell, per place status.
+
+    Kept up to date incrementally by every write that adds a place, upvotes
+    one or changes its status, so region scores can sum cells instead of
+    scanning places. The id is "<status>:<geohash>".
+    """
+
+    id = StringField(primary_key=True)
+    geohash = StringField(required=True)
+    precision = IntField(required=True)
+    status = StringField(required=True, choices=["pending", "approved", "rejected"])
+    place_count = IntField(default=0)
+    total_upvotes = IntField(default=0)
+    # Latest write-behind flushes added to this cell, so a retried flush
+    # can't add the same upvotes twice.
+    upvote_flushes = ListField(StringField())
+
+    meta = {"collection": "safety_cells"}
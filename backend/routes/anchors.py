@@ -0,0 +1,74 @@
+from bson import ObjectId
+from flask import Blueprint, request, jsonify
+
+from models import AnchorOutbox
+from services.anchoring import PROVISIONAL_PREFIX
+from services.solana_service import get_rpc_stats
+from utils.errors import error_response
+from utils.merkle import root_from_proof
+
+
+bp = Blueprint("anchors", __name__)
+
+
+def anchor_from_doc(doc):
+    return {
+        "id": doc.id,
+        "kind": doc.kind,
+        "place_id": doc.place_id,
+        "memo": doc.memo,
+        "status": doc.status,
+        "signature": doc.signature,
+        "merkle_root": doc.merkle_root,
+        "proof": doc.proof or None,
+        "sent_at": doc.sent_at,
+    }
+
+
+@bp.get("/anchors/rpc-stats")
+def get_anchor_rpc_stats():
+    return jsonify(get_rpc_stats())
+
+
+@bp.get("/anchors/<anchor_id>")
+def get_anchor(anchor_id):
+    anchor_id = anchor_id.removeprefix(PROVISIONAL_PREFIX)
+    anchor = None
+    if ObjectId.is_valid(anchor_id):
+        anchor = AnchorOutbox.objects(id=anchor_id).first()
+    if not anchor:
+        return error_response(
+            "Anchor with given ID does not exist",
+            error="Not Found",
+            code="ANCHOR_NOT_FOUND",
+            status=404,
+        )
+    return jsonify(anchor_from_doc(anchor))
+
+
+@bp.post("/anchors/verify")
+def verify_anchor_proof():
+    data = request.json or {}
+    memo = data.get("memo")
+    proof = data.get("proof")
+    if not isinstance(memo, str) or not isinstance(proof, list):
+        return error_response("memo and proof required", code="INVALID_PROOF")
+    try:
+        root = root_from_proof(memo, proof)
+    except ValueError as exc:
+        return error_response(str(exc), code="INVALID_PROOF")
+
+    # The root must be one we anchored; our own outbox records which batch
+    # memo carried it, so no RPC call is needed.
+    anchored = (
+        AnchorOutbox.objects(merkle_root=root, status="sent").only("signature").first()
+    )
+    expected = data.get("merkle_root")
+    valid = anchored is not None and expected in (None, root)
+    return jsonify(
+        {
+            "valid": valid,
+            "merkle_root": root,
+            "signature": anchored.signature if anchored else None,
+        }
+    )
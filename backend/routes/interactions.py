@@ -1,20 +1,37 @@
 from datetime import datetime, timezone
 from bson import ObjectId
 from flask import Blueprint, request, jsonify, current_app
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
 
-from models import Place, OnChainData
-from services.rate_limit import is_rate_limited, check_and_set_dedupe
-from services.solana_service import SolanaService, hash_payload
+from models import Place
+from services.anchoring import (
+    enqueue_memo,
+    park_unqueued_upvote,
+    provisional_transaction_id,
+)
+from services.cache import bump_places_version
+from services.rate_limit import (
+    DUPLICATE,
+    RATE_LIMITED,
+    acquire_write_slot,
+    get_rate_limit_stats,
+)
+from services.safety_grid import record_upvotes
+from services.solana_service import hash_payload
+from services.upvotes import (
+    SCORE_FIELDS,
+    record_upvote,
+    refresh_scores,
+    upvote_pipeline,
+    write_behind_enabled,
+)
 from utils.errors import error_response
 
 
 bp = Blueprint("interactions", __name__)
 
 
-def compute_place_safety_score(upvote_count):
-    return min(100.0, float(upvote_count) * 2.0)
-
-
 @bp.post("/places/<place_id>/upvote")
 def upvote_place(place_id):
     fingerprint = request.headers.get("X-Client-Fingerprint")
@@ -24,23 +41,24 @@ def upvote_place(place_id):
             code="MISSING_FINGERPRINT",
         )
 
-    if is_rate_limited(
+    # Rate limit and dedupe in one round trip; a duplicate vote doesn't use
+    # up one of the fingerprint's upvotes.
+    outcome = acquire_write_slot(
         f"upvote:{fingerprint}",
         current_app.config["RATE_LIMIT_UPVOTE_PER_HOUR"],
         current_app.config["RATE_LIMIT_WINDOW_SEC"],
-    ):
+        dedupe_key=f"upvote:{place_id}:{fingerprint}",
+        dedupe_ttl_sec=current_app.config["RATE_LIMIT_WINDOW_SEC"],
+        strategy=current_app.config["RATE_LIMIT_UPVOTE_STRATEGY"],
+    )
+    if outcome == RATE_LIMITED:
         return error_response(
             "Maximum upvotes per hour exceeded",
             error="Rate Limited",
             code="RATE_LIMIT_EXCEEDED",
             status=429,
         )
-
-    dedupe_key = f"upvote:{place_id}:{fingerprint}"
-    already = check_and_set_dedupe(
-        dedupe_key, current_app.config["RATE_LIMIT_WINDOW_SEC"]
-    )
-    if already:
+    if outcome == DUPLICATE:
         return error_response(
             "Already upvoted from this fingerprint",
             error="Conflict",
@@ -48,49 +66,71 @@ def upvote_place(place_id):
             status=409,
         )
 
-    place = None
+    place_filter = {"transaction_id": place_id}
     if ObjectId.is_valid(place_id):
-        place = Place.objects(id=place_id).first()
-    if not place:
-        place = Place.objects(transaction_id=place_id).first()
-    if not place:
+        place_filter = {"$or": [{"_id": ObjectId(place_id)}, place_filter]}
+
+    write_behind = write_behind_enabled()
+    if write_behind:
+        # Viral places would contend on one document; count in Redis and let
+        # the flusher apply the deltas in bulk. Caches catch up on the flush.
+        updated = Place._get_collection().find_one(
+            place_filter, {name: 1 for name in SCORE_FIELDS}
+        )
+    else:
+        # One atomic write instead of update/reload/save, so concurrent upvotes
+        # can't lose increments. The memo's signature lands later via the outbox.
+        updated = Place._get_collection().find_one_and_update(
+            place_filter,
+            upvote_pipeline(),
+            projection={
+                "upvote_count": 1,
+                "safety_score": 1,
+                "location": 1,
+                "status": 1,
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+    if not updated:
         return error_response(
             "Place with given ID does not exist",
             error="Not Found",
             code="PLACE_NOT_FOUND",
             status=404,
         )
+    if write_behind:
+        pending = record_upvote(updated)
+        refresh_scores([updated], deltas={str(updated["_id"]): pending})
+    else:
+        bump_places_version()
+        record_upvotes(
+            [(updated["location"]["coordinates"], updated.get("status", "pending"), 1)]
+        )
 
-    solana = SolanaService(
-        current_app.config["SOLANA_RPC_URL"],
-        current_app.config["SOLANA_KEYPAIR_PATH"],
-    )
     memo_hash = hash_payload(
         "upvote",
         fingerprint,
-        str(place.id),
+        str(updated["_id"]),
         int(datetime.now(timezone.utc).timestamp()),
     )
-    tx_id = solana.send_memo(memo_hash)
-
-    place.update(
-        inc__upvote_count=1,
-        set__indexed_at=datetime.now(timezone.utc),
-    )
-    place.reload()
-    new_safety_score = compute_place_safety_score(place.upvote_count)
-    place.update(set__safety_score=new_safety_score)
-    place.reload()
-
-    place.on_chain_data = place.on_chain_data or OnChainData()
-    place.on_chain_data.raw_data = place.on_chain_data.raw_data or {}
-    place.on_chain_data.raw_data.update({"last_upvote_tx": tx_id})
-    place.save()
+    outbox_id = ObjectId()
+    try:
+        enqueue_memo("upvote", updated["_id"], memo_hash, outbox_id=outbox_id)
+    except PyMongoError as exc:
+        # The upvote is counted; the worker's sweep queues the memo later.
+        current_app.logger.warning("anchor enqueue failed for %s: %s", outbox_id, exc)
+        park_unqueued_upvote(outbox_id, updated["_id"], memo_hash)
 
     return jsonify(
         {
-            "transaction_id": tx_id,
-            "new_upvote_count": place.upvote_count,
-            "new_safety_score": place.safety_score,
+            "transaction_id": provisional_transaction_id(outbox_id),
+            "anchoring_status": "pending",
+            "new_upvote_count": updated["upvote_count"],
+            "new_safety_score": updated["safety_score"],
         }
     )
+
+
+@bp.get("/rate-limit/stats")
+def get_rate_limit_decision_stats():
+    return jsonify(get_rate_limit_stats())
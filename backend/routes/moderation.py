@@ -1,55 +1,118 @@
+from datetime import datetime, timezone
 from bson import ObjectId
-from flask import Blueprint, request, jsonify
+from bson.errors import InvalidId
+from flask import Blueprint, request, jsonify, current_app
 
 from models import Place
+from services.cache import bump_places_version
+from services.clusters import track_place_change
+from services.moderation import pending_count, track_pending_change
+from services.safety_grid import record_status_change
+from utils.cursor import encode_cursor, decode_cursor
 from utils.errors import error_response
+from utils.validation import ALLOWED_CATEGORIES, ALLOWED_PLACE_TYPES, validate_enum
 
 
 bp = Blueprint("moderation", __name__)
 
 
+# Enough for a moderator to judge a submission; upvoted_by, events and
+# on-chain data stay in the database.
+QUEUE_FIELDS = (
+    "transaction_id",
+    "name",
+    "location",
+    "place_type",
+    "category",
+    "upvote_count",
+    "status",
+    "created_at",
+    "description",
+    "era",
+    "photos",
+    "address",
+)
+
+
+def _queue_item(raw):
+    item = {"id": raw["_id"]}
+    item.update({name: raw.get(name) for name in QUEUE_FIELDS})
+    item["status"] = item["status"] or "pending"
+    item["upvote_count"] = item["upvote_count"] or 0
+    item["photos"] = item["photos"] or []
+    return item
+
+
 @bp.get("/moderation/queue")
 def get_queue():
-    limit = int(request.args.get("limit", 20))
-    places = Place.objects(status="pending").order_by("-created_at").limit(limit)
-    payload = []
-    for place in places:
-        payload.append(
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return error_response("limit must be an integer", code="INVALID_LIMIT")
+    limit = max(1, min(limit, current_app.config["MODERATION_QUEUE_MAX_LIMIT"]))
+    place_type = request.args.get("type", "all")
+    category = request.args.get("category")
+    ok, msg = validate_enum(place_type, ALLOWED_PLACE_TYPES, "type")
+    if not ok:
+        return error_response(msg, code="INVALID_TYPE")
+    ok, msg = validate_enum(category, ALLOWED_CATEGORIES, "category")
+    if not ok:
+        return error_response(msg, code="INVALID_CATEGORY")
+
+    query = {"status": "pending"}
+    if place_type != "all":
+        query["place_type"] = place_type
+    if category:
+        query["category"] = category
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            last_created_at = values["t"]
+            if last_created_at is not None:
+                last_created_at = datetime.fromisoformat(last_created_at)
+            last_id = ObjectId(values["id"])
+        except (KeyError, TypeError, ValueError, InvalidId):
+            return error_response("cursor is invalid", code="INVALID_CURSOR")
+        # Newest first; submissions sharing a created_at are told apart by
+        # _id, so the (status, created_at, _id) index serves every page.
+        # Legacy rows without a created_at sort after all the others.
+        if last_created_at is None:
+            query["created_at"] = None
+            query["_id"] = {"$lt": last_id}
+        else:
+            query["$or"] = [
+                {"created_at": {"$lt": last_created_at}},
+                {"created_at": last_created_at, "_id": {"$lt": last_id}},
+                {"created_at": None},
+            ]
+
+    rows = list(
+        Place._get_collection()
+        .find(query, {name: 1 for name in QUEUE_FIELDS})
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit)
+    )
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        created_at = last.get("created_at")
+        next_cursor = encode_cursor(
             {
-                "id": str(place.id),
-                "transaction_id": place.transaction_id,
-                "name": place.name,
-                "location": {
-                    "type": place.location.type,
-                    "coordinates": place.location.coordinates,
-                },
-                "place_type": place.place_type,
-                "category": place.category,
-                "safety_score": place.safety_score,
-                "upvote_count": place.upvote_count,
-                "status": place.status,
-                "created_at": place.created_at.isoformat()
-                if place.created_at
-                else None,
-                "description": place.description,
-                "era": place.era,
-                "photos": place.photos,
-                "address": place.address,
-                "additional_info": place.additional_info,
-                "on_chain_data": {
-                    "account_address": place.on_chain_data.account_address
-                    if place.on_chain_data
-                    else None,
-                    "raw_data": place.on_chain_data.raw_data
-                    if place.on_chain_data
-                    else None,
-                },
-                "indexed_at": place.indexed_at.isoformat()
-                if place.indexed_at
-                else None,
+                "t": created_at.isoformat() if created_at else None,
+                "id": str(last["_id"]),
             }
         )
-    return jsonify(payload)
+    return jsonify(
+        {
+            "places": [_queue_item(row) for row in rows],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "pending_count": pending_count(),
+        }
+    )
 
 
 @bp.patch("/moderation/places/<place_id>")
@@ -76,15 +139,23 @@ def moderate_place(place_id):
             status=404,
         )
 
+    previous_status = place.status
     place.status = status
+    place.indexed_at = datetime.now(timezone.utc)
     if reason:
         place.additional_info = place.additional_info or {}
         place.additional_info["moderation_reason"] = reason
     place.save()
+    bump_places_version()
+    track_place_change(place)
+    record_status_change(
+        place.location.coordinates, previous_status, status, place.upvote_count or 0
+    )
+    track_pending_change(previous_status, status)
 
     return jsonify(
         {
-            "id": str(place.id),
+            "id": place.id,
             "transaction_id": place.transaction_id,
             "name": place.name,
             "location": {
@@ -96,7 +167,7 @@ def moderate_place(place_id):
             "safety_score": place.safety_score,
             "upvote_count": place.upvote_count,
             "status": place.status,
-            "created_at": place.created_at.isoformat() if place.created_at else None,
+            "created_at": place.created_at,
             "description": place.description,
             "era": place.era,
             "photos": place.photos,
@@ -108,6 +179,6 @@ def moderate_place(place_id):
                 else None,
                 "raw_data": place.on_chain_data.raw_data if place.on_chain_data else None,
             },
-            "indexed_at": place.indexed_at.isoformat() if place.indexed_at else None,
+            "indexed_at": place.indexed_at,
         }
     )
@@ -1,10 +1,44 @@
 from datetime import datetime, timezone
+import bson
 from bson import ObjectId
+from bson.errors import InvalidId
 from flask import Blueprint, request, jsonify, current_app
+from pymongo.errors import PyMongoError
 
-from models import Place, GeoJSONPoint, OnChainData
+from models import Place, GeoJSONPoint, OnChainData, SUMMARY_FIELDS
+from services.anchoring import enqueue_memo, provisional_transaction_id
+from services.cache import (
+    bump_places_version,
+    cache_get,
+    cache_set,
+    current_places_version,
+    get_cache_stats,
+    places_cache_key,
+    quantize_viewport,
+    record_cache_lookup,
+)
+from services.clusters import query_clusters, track_place_change
+from services.moderation import track_pending_change
 from services.rate_limit import is_rate_limited
-from services.solana_service import SolanaService, hash_payload
+from services.safety_grid import record_place_added
+from services.snapshot import PlaceSnapshot, get_snapshot
+from services.solana_service import hash_payload
+from services.upvotes import (
+    SCORE_FIELDS,
+    refresh_scores,
+)
+from utils.bbox import parse_bbox, parse_bbox_string, bbox_polygons
+from utils.cursor import encode_cursor, decode_cursor
+from utils.columnar import (
+    ALLOWED_FORMATS,
+    COLUMNAR_FIELDS,
+    JSON_MIMETYPE,
+    MSGPACK_MIMETYPE,
+    encode_msgpack,
+    place_columns,
+    response_format,
+)
+from utils.conditional import make_etag, not_modified, with_caching_headers
 from utils.errors import error_response
 from utils.validation import (
     validate_geojson_point,
@@ -13,15 +47,28 @@ from utils.validation import (
     ALLOWED_CATEGORIES,
     ALLOWED_STATUS,
     ALLOWED_STILL_EXISTS,
+    ALLOWED_TOTAL_MODES,
+    ALLOWED_SUMMARY_FIELDS,
 )
 
 
 bp = Blueprint("places", __name__)
 
+# Upper bound on how many in-radius places are counted for total=estimate.
+ESTIMATE_TOTAL_CAP = 1000
+
+# Default and hard cap on how many places one viewport request returns.
+BBOX_DEFAULT_LIMIT = 500
+BBOX_MAX_RESULTS = 1000
+
+# Safety net for oversized viewports; a normal screen holds a few hundred cells.
+CLUSTERS_MAX_RESULTS = 1000
+MAX_ZOOM = 22
+
 
 def place_summary_from_doc(doc, distance_meters=None):
     return {
-        "id": str(doc.id),
+        "id": doc.id,
         "transaction_id": doc.transaction_id,
         "name": doc.name,
         "location": {
@@ -34,13 +81,87 @@ def place_summary_from_doc(doc, distance_meters=None):
         "upvote_count": doc.upvote_count,
         "distance_meters": distance_meters,
         "status": doc.status,
-        "created_at": doc.created_at.isoformat() if doc.created_at else None,
+        "created_at": doc.created_at,
         "movements": doc.movements or [],
         "significance": doc.significance,
         "still_exists": doc.still_exists,
     }
 
 
+def summary_projection(fields=None):
+    """$project stage that keeps list pipelines from hauling whole documents.
+
+    Heavy fields (events, related_figures, additional_info, upvoted_by) are
+    never loaded. distance_meters is kept so $geoNear results stay pageable.
+    """
+    fields = fields or SUMMARY_FIELDS
+    projection = {name: 1 for name in fields if name not in ("id", "distance_meters")}
+    projection["distance_meters"] = 1
+    # refresh_scores recomputes safety_score from these at read time.
+    projection.update({name: 1 for name in SCORE_FIELDS})
+    return {"$project": projection}
+
+
+def place_summary_from_raw(raw, fields=None):
+    """Serialize a projected aggregation result, optionally to a subset of fields."""
+    summary = {
+        "id": raw.get("_id"),
+        "transaction_id": raw.get("transaction_id"),
+        "name": raw.get("name"),
+        "location": raw.get("location"),
+        "place_type": raw.get("place_type"),
+        "category": raw.get("category"),
+        "safety_score": raw.get("safety_score", 0),
+        "upvote_count": raw.get("upvote_count", 0),
+        "distance_meters": raw.get("distance_meters"),
+        "status": raw.get("status", "pending"),
+        "created_at": raw.get("created_at"),
+        "movements": raw.get("movements", []),
+        "significance": raw.get("significance"),
+        "still_exists": raw.get("still_exists"),
+    }
+    if fields:
+        summary = {key: summary[key] for key in ("id", *fields) if key in summary}
+    return summary
+
+
+def parse_summary_fields(value):
+    """Parse the comma-separated fields= parameter. Returns (fields, error)."""
+    if not value:
+        return None, None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    for name in fields:
+        ok, msg = validate_enum(name, ALLOWED_SUMMARY_FIELDS, "fields")
+        if not ok:
+            return None, msg
+    return fields, None
+
+
+def validate_place_filters(place_type, category, status):
+    """Check the type/category/status filters; returns an error response or None."""
+    ok, msg = validate_enum(place_type, ALLOWED_PLACE_TYPES, "type")
+    if not ok:
+        return error_response(msg, code="INVALID_TYPE")
+    ok, msg = validate_enum(category, ALLOWED_CATEGORIES, "category")
+    if not ok:
+        return error_response(msg, code="INVALID_CATEGORY")
+    ok, msg = validate_enum(status, ALLOWED_STATUS, "status")
+    if not ok:
+        return error_response(msg, code="INVALID_STATUS")
+    return None
+
+
+def place_filter_query(place_type, category, status):
+    query = {}
+    if place_type and place_type != "all":
+        query["place_type"] = place_type
+    if category:
+        query["category"] = category
+    if status:
+        query["status"] = status
+    return query
+
+
 def place_detail_from_doc(doc):
     payload = place_summary_from_doc(doc, distance_meters=None)
     payload.update(
@@ -56,7 +177,8 @@ def place_detail_from_doc(doc):
                 else None,
                 "raw_data": doc.on_chain_data.raw_data if doc.on_chain_data else None,
             },
-            "indexed_at": doc.indexed_at.isoformat() if doc.indexed_at else None,
+            "indexed_at": doc.indexed_at,
+            "anchoring_status": doc.anchoring_status or "anchored",
             "events": [
                 {
                     "title": e.title,
@@ -83,6 +205,175 @@ def place_detail_from_doc(doc):
     return payload
 
 
+def _geo_near_stage(lat, lon, radius, query, min_distance=None):
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [lon, lat]},
+        "distanceField": "distance_meters",
+        "maxDistance": radius,
+        "spherical": True,
+        "query": query,
+    }
+    if min_distance is not None:
+        geo_near["minDistance"] = min_distance
+    return {"$geoNear": geo_near}
+
+
+def _after_cursor(after):
+    last_distance, last_id = after
+    return {
+        "$match": {
+            "$or": [
+                {"distance_meters": {"$gt": last_distance}},
+                {"distance_meters": last_distance, "_id": {"$gt": last_id}},
+            ]
+        }
+    }
+
+
+def nearby_pipeline(lat, lon, radius, query, limit, offset, after, total_mode, fields):
+    """The $geoNear pipeline behind GET /places.
+
+    Pages hold one row more than limit, in $geoNear's own distance order;
+    settle_boundary_ties turns that into limit rows in (distance, _id) order.
+    """
+    if after:
+        # Resume where the previous page stopped instead of skipping over it:
+        # minDistance lets $geoNear start at the last distance, and places at
+        # exactly that distance are told apart by _id.
+        pipeline = [_geo_near_stage(lat, lon, radius, query, after[0])]
+        pipeline.append(_after_cursor(after))
+        page_stages = [{"$limit": limit + 1}]
+    else:
+        pipeline = [_geo_near_stage(lat, lon, radius, query)]
+        page_stages = [{"$skip": offset}, {"$limit": limit + 1}]
+    pipeline.append(summary_projection(fields))
+    if total_mode == "none":
+        pipeline.extend(page_stages)
+    else:
+        # Page and in-radius count come back together from a single round trip.
+        # "estimate" stops counting at ESTIMATE_TOTAL_CAP so dense areas stay cheap.
+        count_stages = [{"$count": "count"}]
+        if total_mode == "estimate":
+            count_stages.insert(0, {"$limit": ESTIMATE_TOTAL_CAP})
+        pipeline.append({"$facet": {"places": page_stages, "total": count_stages}})
+    return pipeline
+
+
+def ties_pipeline(lat, lon, distance, query, after, fields):
+    """Every place at exactly distance, past the cursor when there is one."""
+    pipeline = [_geo_near_stage(lat, lon, distance, query, distance)]
+    if after:
+        pipeline.append(_after_cursor(after))
+    pipeline.append(summary_projection(fields))
+    return pipeline
+
+
+def settle_boundary_ties(rows, limit, fetch_ties=None):
+    """Trim a page of limit + 1 $geoNear rows to limit rows in (distance, _id) order.
+
+    $geoNear orders by distance alone, so places sharing the last row's
+    distance can straddle the page boundary in any _id order. Only when the
+    extra row shows such a tie are all places at that distance fetched, via
+    fetch_ties(distance), and the lowest _ids kept, so the cursor's
+    tie-break resumes exactly after them. Everything else is settled by
+    sorting the page itself.
+    """
+    if (
+        fetch_ties is not None
+        and len(rows) > limit
+        and rows[limit]["distance_meters"] == rows[limit - 1]["distance_meters"]
+    ):
+        boundary = rows[limit - 1]["distance_meters"]
+        rows = [r for r in rows if r["distance_meters"] < boundary]
+        rows += fetch_ties(boundary)
+    rows = sorted(rows, key=lambda r: (r["distance_meters"], r["_id"]))
+    return rows[:limit]
+
+
+def _nearby_from_mongo(
+    lat, lon, radius, query, limit, offset, after, total_mode, fields
+):
+    pipeline = nearby_pipeline(
+        lat, lon, radius, query, limit, offset, after, total_mode, fields
+    )
+    results = list(Place.objects.aggregate(*pipeline))
+    total = None
+    if total_mode == "none":
+        raw_places = results
+    else:
+        facet = results[0] if results else {}
+        raw_places = facet.get("places", [])
+        counts = facet.get("total", [])
+        total = counts[0]["count"] if counts else 0
+
+    fetch_ties = None
+    if after or not offset:
+        # Pages that hand out a cursor; offset pages never mix with cursors.
+        def fetch_ties(distance):
+            return list(
+                Place.objects.aggregate(
+                    *ties_pipeline(lat, lon, distance, query, after, fields)
+                )
+            )
+
+    return settle_boundary_ties(raw_places, limit, fetch_ties), total
+
+
+def candidates_pipeline(lat, lon, radius, query, max_rows):
+    """Up to max_rows + 1 places within radius, for the viewport cache."""
+    return [
+        _geo_near_stage(lat, lon, radius, query),
+        {"$limit": max_rows + 1},
+        summary_projection(),
+    ]
+
+
+def _cached_candidates(version, lat, lon, radius, query, filters):
+    """Places that may lie within radius of lat/lon, cached per geohash cell.
+
+    The cached circle is centered on the cell and wide enough to contain the
+    caller's circle from anywhere in the cell, so every client panning within
+    it shares one entry and trims it to its own center and radius. Returns
+    (rows or None, cache status); None means query Mongo directly, because
+    caching is off or the area holds more than PLACES_CACHE_MAX_ROWS places.
+    """
+    config = current_app.config
+    ttl = config["PLACES_CACHE_TTL_SEC"]
+    if ttl <= 0 or PlaceSnapshot is None:
+        return None, None
+    center_lat, center_lon, cover_radius, cell = quantize_viewport(
+        lat, lon, radius, config["PLACES_CACHE_GEOHASH_PRECISION"]
+    )
+    place_type, category, status = filters
+    key = places_cache_key(
+        version,
+        cell,
+        cover_radius,
+        {"type": place_type, "category": category, "status": status},
+    )
+    body = cache_get(key)
+    if body:
+        rows = bson.decode(body)["places"]
+        if rows is None:
+            record_cache_lookup("bypasses")
+            return None, "BYPASS"
+        record_cache_lookup("hits")
+        return rows, "HIT"
+    record_cache_lookup("misses")
+
+    max_rows = config["PLACES_CACHE_MAX_ROWS"]
+    pipeline = candidates_pipeline(
+        center_lat, center_lon, cover_radius, query, max_rows
+    )
+    rows = list(Place.objects.aggregate(*pipeline))
+    if len(rows) > max_rows:
+        # Remember the area is too dense so the next request skips straight
+        # to the exact query.
+        rows = None
+    cache_set(key, bson.encode({"places": rows}), ttl)
+    return rows, "MISS"
+
+
 @bp.get("/places")
 def get_places():
     try:
@@ -97,75 +388,194 @@ def get_places():
     status = request.args.get("status")
     limit = min(int(request.args.get("limit", 50)), 100)
     offset = int(request.args.get("offset", 0))
+    total_mode = request.args.get("total", "exact")
+    cursor = request.args.get("cursor")
+    fields, msg = parse_summary_fields(request.args.get("fields"))
+    if msg:
+        return error_response(msg, code="INVALID_FIELDS")
+    output = response_format(request)
+    if output != "msgpack":
+        ok, msg = validate_enum(output, ALLOWED_FORMATS, "format")
+        if not ok:
+            return error_response(msg, code="INVALID_FORMAT")
+    if output != "json":
+        fields = COLUMNAR_FIELDS
 
-    ok, msg = validate_enum(place_type, ALLOWED_PLACE_TYPES, "type")
-    if not ok:
-        return error_response(msg, code="INVALID_TYPE")
-    ok, msg = validate_enum(category, ALLOWED_CATEGORIES, "category")
-    if not ok:
-        return error_response(msg, code="INVALID_CATEGORY")
-    ok, msg = validate_enum(status, ALLOWED_STATUS, "status")
+    error = validate_place_filters(place_type, category, status)
+    if error:
+        return error
+    ok, msg = validate_enum(total_mode, ALLOWED_TOTAL_MODES, "total")
     if not ok:
-        return error_response(msg, code="INVALID_STATUS")
+        return error_response(msg, code="INVALID_TOTAL")
 
-    query = {}
-    if place_type and place_type != "all":
-        query["place_type"] = place_type
-    if category:
-        query["category"] = category
-    if status:
-        query["status"] = status
+    after = None
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            after = (float(values["d"]), ObjectId(values["id"]))
+        except (KeyError, TypeError, ValueError, InvalidId):
+            return error_response("cursor is invalid", code="INVALID_CURSOR")
 
-    pipeline = [
-        {
-            "$geoNear": {
-                "near": {"type": "Point", "coordinates": [lon, lat]},
-                "distanceField": "distance_meters",
-                "maxDistance": radius,
-                "spherical": True,
-                "query": query,
-            }
-        },
-        {"$skip": offset},
-        {"$limit": limit},
-    ]
+    # Every write bumps the places version, so the version plus the query
+    # names the response without running it.
+    version = current_places_version()
+    etag = None
+    if version is not None:
+        args = sorted(request.args.items(multi=True))
+        etag = make_etag("places", version, output, args)
+        response = not_modified(etag)
+        if response:
+            return response
 
-    places_cursor = Place.objects.aggregate(*pipeline)
-    places = []
-    for p in places_cursor:
-        places.append(
-            {
-                "id": str(p.get("_id")),
-                "transaction_id": p.get("transaction_id"),
-                "name": p.get("name"),
-                "location": p.get("location"),
-                "place_type": p.get("place_type"),
-                "category": p.get("category"),
-                "safety_score": p.get("safety_score", 0),
-                "upvote_count": p.get("upvote_count", 0),
-                "distance_meters": p.get("distance_meters"),
-                "status": p.get("status", "pending"),
-                "created_at": p.get("created_at").isoformat()
-                if p.get("created_at")
-                else None,
-                "movements": p.get("movements", []),
-                "significance": p.get("significance"),
-                "still_exists": p.get("still_exists"),
-            }
+    query = place_filter_query(place_type, category, status)
+    count_cap = ESTIMATE_TOTAL_CAP if total_mode == "estimate" else None
+    raw_places = None
+    cache_status = None
+    snapshot = get_snapshot()
+    if snapshot is None and version is not None:
+        candidates, cache_status = _cached_candidates(
+            version, lat, lon, radius, query, (place_type, category, status)
+        )
+        if candidates is not None:
+            # Distances and the radius are the caller's own; the cached rows
+            # only save the round trip to Mongo.
+            snapshot = PlaceSnapshot(candidates)
+    if snapshot is not None:
+        raw_places, total = snapshot.nearby(
+            lat,
+            lon,
+            radius,
+            query,
+            limit,
+            offset=offset,
+            after=after,
+            count_cap=count_cap,
+        )
+        if total_mode == "none":
+            total = None
+    else:
+        raw_places, total = _nearby_from_mongo(
+            lat, lon, radius, query, limit, offset, after, total_mode, fields
         )
+    refresh_scores(raw_places)
 
-    total = Place.objects(__raw__=query).count()
+    if output == "json":
+        places = [place_summary_from_raw(p, fields) for p in raw_places]
+    else:
+        places = place_columns(raw_places)
+
+    next_cursor = None
+    if len(raw_places) == limit:
+        last = raw_places[-1]
+        next_cursor = encode_cursor(
+            {"d": last["distance_meters"], "id": str(last["_id"])}
+        )
+
+    payload = {
+        "places": places,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
+    if total_mode == "estimate":
+        payload["total_capped"] = total >= ESTIMATE_TOTAL_CAP
 
+    if output == "msgpack":
+        body = encode_msgpack(payload)
+    else:
+        body = current_app.json.dumps(payload).encode("utf-8")
+    return _places_body(body, output, cache_status=cache_status, etag=etag)
+
+
+def _places_body(body, output, cache_status=None, etag=None):
+    mimetype = MSGPACK_MIMETYPE if output == "msgpack" else JSON_MIMETYPE
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    if cache_status:
+        response.headers["X-Cache"] = cache_status
+    return with_caching_headers(response, etag)
+
+
+@bp.get("/places/bbox")
+def get_places_in_bbox():
+    bbox, msg = parse_bbox(request.args)
+    if msg:
+        return error_response(msg, code="INVALID_BBOX")
+
+    place_type = request.args.get("type", "all")
+    category = request.args.get("category")
+    status = request.args.get("status")
+    limit = min(int(request.args.get("limit", BBOX_DEFAULT_LIMIT)), BBOX_MAX_RESULTS)
+    fields, msg = parse_summary_fields(request.args.get("fields"))
+    if msg:
+        return error_response(msg, code="INVALID_FIELDS")
+    error = validate_place_filters(place_type, category, status)
+    if error:
+        return error
+
+    # One extra row tells us whether the viewport was truncated.
+    query = place_filter_query(place_type, category, status)
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        raw_places = snapshot.within_bbox(*bbox, query, limit + 1)
+    else:
+        # No distance to sort by, so the 2dsphere index can answer
+        # $geoWithin directly.
+        polygons = [
+            {"location": {"$geoWithin": {"$geometry": polygon}}}
+            for polygon in bbox_polygons(*bbox)
+        ]
+        if len(polygons) == 1:
+            query.update(polygons[0])
+        else:
+            query["$or"] = polygons
+        pipeline = [
+            {"$match": query},
+            {"$limit": limit + 1},
+            summary_projection(fields),
+        ]
+        raw_places = list(Place.objects.aggregate(*pipeline))
+    truncated = len(raw_places) > limit
+    raw_places = refresh_scores(raw_places[:limit])
+    places = [place_summary_from_raw(p, fields) for p in raw_places]
+    west, south, east, north = bbox
     return jsonify(
         {
             "places": places,
-            "total": total,
-            "offset": offset,
+            "bbox": {"west": west, "south": south, "east": east, "north": north},
             "limit": limit,
+            "truncated": truncated,
         }
     )
 
 
+@bp.get("/places/clusters")
+def get_place_clusters():
+    bbox, msg = parse_bbox_string(request.args.get("bbox"))
+    if msg:
+        return error_response(msg, code="INVALID_BBOX")
+    try:
+        zoom = int(request.args.get("zoom"))
+    except (TypeError, ValueError):
+        return error_response("zoom required", code="INVALID_ZOOM")
+    if not 0 <= zoom <= MAX_ZOOM:
+        return error_response(
+            f"zoom must be between 0 and {MAX_ZOOM}", code="INVALID_ZOOM"
+        )
+
+    clusters, truncated = query_clusters(zoom, bbox, CLUSTERS_MAX_RESULTS)
+    return jsonify({"zoom": zoom, "clusters": clusters, "truncated": truncated})
+
+
+@bp.get("/places/cache-stats")
+def get_places_cache_stats():
+    stats = get_cache_stats()
+    stats["ttl_sec"] = current_app.config["PLACES_CACHE_TTL_SEC"]
+    stats["geohash_precision"] = current_app.config["PLACES_CACHE_GEOHASH_PRECISION"]
+    return jsonify(stats)
+
+
 @bp.post("/places")
 def submit_place():
     data = request.json or {}
@@ -180,6 +590,7 @@ def submit_place():
         f"submit:{fingerprint}",
         current_app.config["RATE_LIMIT_SUBMIT_PER_HOUR"],
         current_app.config["RATE_LIMIT_WINDOW_SEC"],
+        current_app.config["RATE_LIMIT_SUBMIT_STRATEGY"],
     ):
         return error_response(
             "Maximum submissions per hour exceeded",
@@ -214,10 +625,6 @@ def submit_place():
         coordinates=data["location"]["coordinates"],
     )
 
-    solana = SolanaService(
-        current_app.config["SOLANA_RPC_URL"],
-        current_app.config["SOLANA_KEYPAIR_PATH"],
-    )
     memo_hash = hash_payload(
         "submit",
         fingerprint,
@@ -226,7 +633,10 @@ def submit_place():
         geo_point.coordinates[0],
         int(datetime.now(timezone.utc).timestamp()),
     )
-    tx_id = solana.send_memo(memo_hash)
+    # The memo is anchored by the outbox worker; until then the place carries
+    # a provisional transaction_id derived from its outbox entry.
+    outbox_id = ObjectId()
+    tx_id = provisional_transaction_id(outbox_id)
 
     # Parse optional integer fields safely
     year_opened = data.get("year_opened")
@@ -261,17 +671,29 @@ def submit_place():
         indexed_at=datetime.now(timezone.utc),
         on_chain_data=OnChainData(
             account_address=None,
-            raw_data={"memo": memo_hash, "signature": tx_id},
+            raw_data={"memo": memo_hash, "signature": None},
         ),
+        anchoring_status="pending",
     )
     place.save()
+    try:
+        enqueue_memo("submit", place.id, memo_hash, outbox_id=outbox_id)
+    except PyMongoError as exc:
+        # The place is saved; the worker's sweep recreates the entry from
+        # its provisional transaction_id.
+        current_app.logger.warning("anchor enqueue failed for %s: %s", place.id, exc)
+    bump_places_version()
+    track_place_change(place)
+    record_place_added(place.location.coordinates, place.status)
+    track_pending_change(None, place.status)
 
     return (
         jsonify(
             {
                 "transaction_id": tx_id,
-                "place_id": str(place.id),
+                "place_id": place.id,
                 "status": place.status,
+                "anchoring_status": place.anchoring_status,
             }
         ),
         201,
@@ -293,4 +715,22 @@ def get_place_by_id(place_id):
             status=404,
         )
 
-    return jsonify(place_detail_from_doc(place))
+    # indexed_at moves on every write to the place, so it versions the detail;
+    # unflushed write-behind upvotes and score decay haven't touched it.
+    raw = {"_id": place.id, **{name: place[name] for name in SCORE_FIELDS}}
+    [scores] = refresh_scores([raw])
+    indexed_at = place.indexed_at.isoformat() if place.indexed_at else None
+    etag = make_etag(
+        "place",
+        place.id,
+        indexed_at,
+        scores["upvote_count"],
+        round(scores["safety_score"], 1),
+    )
+    response = not_modified(etag)
+    if response:
+        return response
+    payload = place_detail_from_doc(place)
+    payload["upvote_count"] = scores["upvote_count"]
+    payload["safety_score"] = scores["safety_score"]
+    return with_caching_headers(jsonify(payload), etag)
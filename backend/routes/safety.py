@@ -1,10 +1,37 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import Place
+from services.cache import tile_cache_get, tile_cache_set
+from services.safety_grid import region_stats
+from services.snapshot import get_snapshot
+from services.upvotes import safety_score_expression
+from utils.bbox import EARTH_RADIUS_METERS, bbox_polygons, radius_bbox
+from utils.columnar import (
+    ALLOWED_FORMATS,
+    JSON_MIMETYPE,
+    MSGPACK_MIMETYPE,
+    encode_msgpack,
+    packed_points,
+    response_format,
+)
 from utils.errors import error_response
+from utils.heatmap import (
+    ALLOWED_CELL_PX,
+    DEFAULT_CELL_PX,
+    MAX_HEATMAP_CELLS,
+    MAX_HEATMAP_ZOOM,
+    bin_points,
+    cell_count,
+    in_tile,
+)
+from utils.tiles import tile_bounds
+from utils.validation import ALLOWED_SAFETY_MODES, ALLOWED_STATUS, validate_enum
 
 
 bp = Blueprint("safety", __name__)
 
+# Most points one POST /safety-scores/batch request may score.
+BATCH_MAX_POINTS = 100
+
 
 def compute_region_score(place_count, total_upvotes):
     return min(100.0, (place_count * 5.0) + (total_upvotes * 2.0))
@@ -19,7 +46,145 @@ def get_safety_heatmap():
         return error_response("lat and lon required", code="INVALID_COORDS")
 
     radius = int(request.args.get("radius", 50000))
+    output = response_format(request)
+    if output != "msgpack":
+        ok, msg = validate_enum(output, ALLOWED_FORMATS, "format")
+        if not ok:
+            return error_response(msg, code="INVALID_FORMAT")
+
+    zoom = None
+    if request.args.get("zoom") is not None:
+        zoom, cell_px, error = _parse_binning(request.args.get("zoom"))
+        if error:
+            return error
+        cells = cell_count(*radius_bbox(lat, lon, radius), zoom, cell_px)
+        if cells > MAX_HEATMAP_CELLS:
+            return error_response(
+                f"radius spans {cells} cells at this zoom (max "
+                f"{MAX_HEATMAP_CELLS}); lower zoom or raise cell_px",
+                code="VIEWPORT_TOO_LARGE",
+            )
+
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        heatmap = snapshot.heatmap(lat, lon, radius, {"status": "approved"})
+    else:
+        heatmap = _heatmap_from_mongo(lat, lon, radius)
+
+    if zoom is None:
+        response = _heatmap_response(heatmap, 3, output)
+    else:
+        binned = bin_points(heatmap, zoom, cell_px)
+        response = _heatmap_response(
+            binned, 4, output, {"zoom": zoom, "cell_px": cell_px}
+        )
+    response.vary.add("Accept")
+    return response
+
+
+@bp.get("/safety-scores/heatmap/tiles/<int:z>/<int:x>/<int:y>")
+def get_safety_heatmap_tile(z, x, y):
+    if z > MAX_HEATMAP_ZOOM or x >= 1 << z or y >= 1 << z:
+        return error_response(
+            "Tile is outside the tile grid",
+            error="Not Found",
+            code="TILE_NOT_FOUND",
+            status=404,
+        )
+    _, cell_px, error = _parse_binning(z)
+    if error:
+        return error
+    output = response_format(request)
+    if output != "msgpack":
+        ok, msg = validate_enum(output, ALLOWED_FORMATS, "format")
+        if not ok:
+            return error_response(msg, code="INVALID_FORMAT")
+
+    # Cells never straddle tiles, so each tile is binned and cached alone.
+    body, cache_key = tile_cache_get(z, x, y, layer=f"heatmap:{cell_px}:{output}")
+    cache_status = "HIT" if body is not None else "MISS"
+    if body is None:
+        points = [
+            point
+            for point in _heatmap_points_in_bbox(tile_bounds(z, x, y))
+            if in_tile(point[0], point[1], z, x, y)
+        ]
+        binned = bin_points(points, z, cell_px)
+        extra = {"z": z, "x": x, "y": y, "cell_px": cell_px}
+        body = _heatmap_response(binned, 4, output, extra).get_data()
+        if cache_key:
+            tile_cache_set(cache_key, body, current_app.config["TILES_CACHE_TTL_SEC"])
+
+    mimetype = MSGPACK_MIMETYPE if output == "msgpack" else JSON_MIMETYPE
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    response.headers["Cache-Control"] = (
+        f"public, max-age={current_app.config['TILES_MAX_AGE_SEC']}"
+    )
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+def _parse_binning(zoom):
+    """Read zoom and cell_px. Returns (zoom, cell_px, error response or None)."""
+    try:
+        zoom = int(zoom)
+        cell_px = int(request.args.get("cell_px", DEFAULT_CELL_PX))
+    except (TypeError, ValueError):
+        return None, None, error_response(
+            "zoom and cell_px must be integers", code="INVALID_ZOOM"
+        )
+    if not 0 <= zoom <= MAX_HEATMAP_ZOOM:
+        return None, None, error_response(
+            f"zoom must be between 0 and {MAX_HEATMAP_ZOOM}", code="INVALID_ZOOM"
+        )
+    if cell_px not in ALLOWED_CELL_PX:
+        return None, None, error_response(
+            f"cell_px must be one of {sorted(ALLOWED_CELL_PX)}", code="INVALID_CELL_PX"
+        )
+    return zoom, cell_px, None
+
+
+def _heatmap_response(rows, stride, output, extra=None):
+    """JSON list (or object with cells) of rows, or a packed Float32 buffer."""
+    if output == "json":
+        if extra is None:
+            return jsonify(rows)
+        return jsonify({**extra, "cells": rows})
+    # Rows packed as one Float32 buffer of `stride` values each.
+    payload = {**(extra or {}), **packed_points(rows, stride, output)}
+    if output == "msgpack":
+        return current_app.response_class(
+            encode_msgpack(payload), mimetype=MSGPACK_MIMETYPE
+        )
+    return jsonify(payload)
 
+
+def _heatmap_points_in_bbox(bbox):
+    """[lon, lat, safety_score] of approved places inside a bbox."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        rows = snapshot.within_bbox(*bbox, {"status": "approved"}, len(snapshot))
+        return [
+            [*row["location"]["coordinates"], row.get("safety_score", 0)]
+            for row in rows
+        ]
+    polygons = bbox_polygons(*bbox)
+    query = {
+        "status": "approved",
+        "$or": [{"location": {"$geoWithin": {"$geometry": p}}} for p in polygons],
+    }
+    projection = {
+        "_id": 0,
+        "lon": {"$arrayElemAt": ["$location.coordinates", 0]},
+        "lat": {"$arrayElemAt": ["$location.coordinates", 1]},
+        "safety_score": safety_score_expression(),
+    }
+    results = Place.objects.aggregate({"$match": query}, {"$project": projection})
+    return [[r["lon"], r["lat"], r.get("safety_score", 0)] for r in results]
+
+
+def _heatmap_from_mongo(lat, lon, radius):
     pipeline = [
         {
             "$geoNear": {
@@ -35,26 +200,16 @@ def get_safety_heatmap():
                 "_id": 0,
                 "lon": {"$arrayElemAt": ["$location.coordinates", 0]},
                 "lat": {"$arrayElemAt": ["$location.coordinates", 1]},
-                "safety_score": 1,
+                "safety_score": safety_score_expression(),
             }
         },
     ]
 
     results = list(Place.objects.aggregate(*pipeline))
-    heatmap = [[r["lon"], r["lat"], r.get("safety_score", 0)] for r in results]
-    return jsonify(heatmap)
+    return [[r["lon"], r["lat"], r.get("safety_score", 0)] for r in results]
 
 
-@bp.get("/safety-scores")
-def get_safety_scores():
-    try:
-        lat = float(request.args.get("lat"))
-        lon = float(request.args.get("lon"))
-    except (TypeError, ValueError):
-        return error_response("lat and lon required", code="INVALID_COORDS")
-
-    radius = int(request.args.get("radius", 50000))
-
+def _region_stats_from_mongo(lat, lon, radius, query):
     pipeline = [
         {
             "$geoNear": {
@@ -62,6 +217,7 @@ def get_safety_scores():
                 "distanceField": "distance_meters",
                 "maxDistance": radius,
                 "spherical": True,
+                "query": query,
             }
         },
         {
@@ -75,11 +231,42 @@ def get_safety_scores():
 
     result = list(Place.objects.aggregate(*pipeline))
     if not result:
-        place_count = 0
-        total_upvotes = 0
+        return 0, 0
+    return result[0].get("place_count", 0), result[0].get("total_upvotes", 0)
+
+
+@bp.get("/safety-scores")
+def get_safety_scores():
+    try:
+        lat = float(request.args.get("lat"))
+        lon = float(request.args.get("lon"))
+    except (TypeError, ValueError):
+        return error_response("lat and lon required", code="INVALID_COORDS")
+
+    radius = int(request.args.get("radius", 50000))
+    status = request.args.get("status")
+    ok, msg = validate_enum(status, ALLOWED_STATUS, "status")
+    if not ok:
+        return error_response(msg, code="INVALID_STATUS")
+    mode = request.args.get("mode", "grid")
+    ok, msg = validate_enum(mode, ALLOWED_SAFETY_MODES, "mode")
+    if not ok:
+        return error_response(msg, code="INVALID_MODE")
+
+    precision = None
+    if mode == "grid":
+        # Sums precomputed geohash cells, so the cost depends on the radius
+        # rather than on how many places are in it.
+        place_count, total_upvotes, precision = region_stats(lat, lon, radius, status)
     else:
-        place_count = result[0].get("place_count", 0)
-        total_upvotes = result[0].get("total_upvotes", 0)
+        query = {"status": status} if status else {}
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            place_count, total_upvotes = snapshot.region_stats(lat, lon, radius, query)
+        else:
+            place_count, total_upvotes = _region_stats_from_mongo(
+                lat, lon, radius, query
+            )
 
     return jsonify(
         {
@@ -88,5 +275,106 @@ def get_safety_scores():
             "safety_score": compute_region_score(place_count, total_upvotes),
             "place_count": place_count,
             "total_upvotes": total_upvotes,
+            "mode": mode,
+            "grid_precision": precision,
+        }
+    )
+
+
+def _parse_batch_points(points):
+    """Validate [{lat, lon}, ...]. Returns ([(lat, lon)], error message)."""
+    if not isinstance(points, list) or not points:
+        return None, "points must be a non-empty list"
+    if len(points) > BATCH_MAX_POINTS:
+        return None, f"at most {BATCH_MAX_POINTS} points per request"
+    parsed = []
+    for point in points:
+        try:
+            lat, lon = float(point["lat"]), float(point["lon"])
+        except (KeyError, TypeError, ValueError):
+            return None, "each point needs numeric lat and lon"
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None, "lat must be within ±90 and lon within ±180"
+        parsed.append((lat, lon))
+    return parsed, None
+
+
+def _batch_region_stats_from_mongo(points, radius, query):
+    """Region stats for every point from one aggregation.
+
+    The leading $match fetches the union of all circles through the 2dsphere
+    index once; each $facet branch then counts its own circle from that set.
+    """
+    spheres = [
+        {
+            "location": {
+                "$geoWithin": {
+                    "$centerSphere": [[lon, lat], radius / EARTH_RADIUS_METERS]
+                }
+            }
+        }
+        for lat, lon in points
+    ]
+    group = {
+        "$group": {
+            "_id": None,
+            "place_count": {"$sum": 1},
+            "total_upvotes": {"$sum": "$upvote_count"},
+        }
+    }
+    facets = {str(i): [{"$match": sphere}, group] for i, sphere in enumerate(spheres)}
+    pipeline = [
+        {"$match": {**query, "$or": spheres}},
+        {"$project": {"location": 1, "upvote_count": 1}},
+        {"$facet": facets},
+    ]
+    result = list(Place.objects.aggregate(*pipeline))
+    groups = result[0] if result else {}
+    stats = []
+    for i in range(len(points)):
+        counts = groups.get(str(i)) or [{}]
+        stats.append(
+            (counts[0].get("place_count", 0), counts[0].get("total_upvotes", 0))
+        )
+    return stats
+
+
+@bp.post("/safety-scores/batch")
+def get_safety_scores_batch():
+    data = request.json or {}
+    points, msg = _parse_batch_points(data.get("points"))
+    if msg:
+        return error_response(msg, code="INVALID_POINTS")
+    try:
+        radius = int(data.get("radius", 50000))
+    except (TypeError, ValueError):
+        return error_response("radius must be an integer", code="INVALID_RADIUS")
+    status = data.get("status")
+    ok, msg = validate_enum(status, ALLOWED_STATUS, "status")
+    if not ok:
+        return error_response(msg, code="INVALID_STATUS")
+
+    # Same counts as mode=exact on GET /safety-scores, for every point at once.
+    query = {"status": status} if status else {}
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        stats = [
+            snapshot.region_stats(lat, lon, radius, query) for lat, lon in points
+        ]
+    else:
+        stats = _batch_region_stats_from_mongo(points, radius, query)
+
+    return jsonify(
+        {
+            "radius_meters": radius,
+            "results": [
+                {
+                    "location": {"lat": lat, "lon": lon},
+                    "safety_score": compute_region_score(place_count, total_upvotes),
+                    "place_count": place_count,
+                    "total_upvotes": total_upvotes,
+                }
+                for (lat, lon), (place_count, total_upvotes) in zip(points, stats)
+            ],
         }
     )
@@ -0,0 +1,74 @@
+from flask import Blueprint, current_app
+
+from models import Place
+from services.cache import tile_cache_get, tile_cache_set
+from services.upvotes import SCORE_FIELDS, refresh_scores
+from utils.bbox import bbox_polygons
+from utils.errors import error_response
+from utils.mvt import EXTENT, encode_point_layer
+from utils.tiles import lonlat_to_world, world_to_lonlat
+
+
+bp = Blueprint("tiles", __name__)
+
+MAX_TILE_ZOOM = 22
+
+# Places this far outside a tile (in tile pixels) are still encoded so that
+# markers straddling a tile edge are drawn whole.
+TILE_BUFFER = 64
+
+TILE_FIELDS = ("name", "category", "place_type", "safety_score")
+
+
+def _buffered_bounds(z, x, y):
+    n = 1 << z
+    pad = TILE_BUFFER / EXTENT
+    west, north = world_to_lonlat(max(x - pad, 0) / n, max(y - pad, 0) / n)
+    east, south = world_to_lonlat(min(x + 1 + pad, n) / n, min(y + 1 + pad, n) / n)
+    return west, south, east, north
+
+
+def _tile_features(z, x, y, places):
+    n = 1 << z
+    for place in places:
+        lon, lat = place["location"]["coordinates"]
+        wx, wy = lonlat_to_world(lon, lat)
+        properties = {"id": str(place["_id"])}
+        properties.update({name: place.get(name) for name in TILE_FIELDS})
+        yield (wx * n - x) * EXTENT, (wy * n - y) * EXTENT, properties
+
+
+@bp.get("/tiles/<int:z>/<int:x>/<int:y>.mvt")
+def get_places_tile(z, x, y):
+    if z > MAX_TILE_ZOOM or x >= 1 << z or y >= 1 << z:
+        return error_response(
+            "Tile is outside the tile grid",
+            error="Not Found",
+            code="TILE_NOT_FOUND",
+            status=404,
+        )
+
+    tile, cache_key = tile_cache_get(z, x, y)
+    cache_status = "HIT" if tile is not None else "MISS"
+    if tile is None:
+        polygons = bbox_polygons(*_buffered_bounds(z, x, y))
+        query = {
+            "status": "approved",
+            "$or": [{"location": {"$geoWithin": {"$geometry": p}}} for p in polygons],
+        }
+        projection = {name: 1 for name in ("location", *TILE_FIELDS, *SCORE_FIELDS)}
+        places = refresh_scores(
+            list(Place.objects.aggregate({"$match": query}, {"$project": projection}))
+        )
+        tile = encode_point_layer("places", _tile_features(z, x, y, places))
+        if cache_key:
+            tile_cache_set(cache_key, tile, current_app.config["TILES_CACHE_TTL_SEC"])
+
+    response = current_app.response_class(
+        tile, mimetype="application/vnd.mapbox-vector-tile"
+    )
+    response.headers["Cache-Control"] = (
+        f"public, max-age={current_app.config['TILES_MAX_AGE_SEC']}"
+    )
+    response.headers["X-Cache"] = cache_status
+    return response
@@ -1562,12 +1562,21 @@ def seed():
 
     print(f"Seed complete: {inserted} inserted, {skipped} skipped (already existed)")
 
+    from services.safety_grid import rebuild_safety_grid
+
+    cells = rebuild_safety_grid()
+    print(f"Safety grid rebuilt: {cells} cells")
+
 
 def main():
+    from db import drop_stale_geo_indexes
+    from models import Place
+
     max_retries = 10
     for attempt in range(max_retries):
         try:
             connect(db=MONGO_DB, host=MONGO_URI, uuidRepresentation="standard")
+            drop_stale_geo_indexes(Place)
             print(f"Connected to MongoDB ({MONGO_URI})")
             break
         except Exception as e:
@@ -0,0 +1,341 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import redis
+from bson import ObjectId
+from flask import current_app
+from pymongo import ReturnDocument, UpdateOne
+
+from models import AnchorOutbox, Place
+from services.cache import bump_places_version
+from services.rate_limit import get_redis
+from services.solana_service import get_solana_service
+from utils.merkle import merkle_tree
+
+
+# transaction_id of a place (and the id handed back for an upvote) until the
+# worker has a real signature.
+PROVISIONAL_PREFIX = "pending:"
+
+# Prefix of the memo that anchors a batch; the Merkle root follows it.
+MERKLE_MEMO_PREFIX = "qwermap-merkle-v1:"
+
+# Upvote memos whose outbox insert failed, held for the worker's sweep.
+UNQUEUED_UPVOTES_KEY = "anchor:unqueued:upvotes"
+
+
+def provisional_transaction_id(outbox_id):
+    return f"{PROVISIONAL_PREFIX}{outbox_id}"
+
+
+def merge_raw_data(values):
+    """Update-pipeline expression that merges values into on_chain_data.raw_data.
+
+    Works when on_chain_data or raw_data is missing or null, and never
+    reads and rewrites the whole dict in Python.
+    """
+    literal = {key: {"$literal": value} for key, value in values.items()}
+    return {
+        "$mergeObjects": [
+            "$on_chain_data",
+            {"raw_data": {"$mergeObjects": ["$on_chain_data.raw_data", literal]}},
+        ]
+    }
+
+
+def enqueue_memo(kind, place_id, memo, outbox_id=None):
+    """Record a memo for the worker to anchor; returns the outbox entry."""
+    entry = AnchorOutbox(id=outbox_id, kind=kind, place_id=place_id, memo=memo)
+    entry.save()
+    return entry
+
+
+def _requeued_entry(outbox_id, kind, place_id, memo):
+    return UpdateOne(
+        {"_id": outbox_id},
+        {
+            "$setOnInsert": {
+                "kind": kind,
+                "place_id": place_id,
+                "memo": memo,
+                "status": "pending",
+                "attempts": 0,
+                "created_at": datetime.now(timezone.utc),
+            }
+        },
+        upsert=True,
+    )
+
+
+def park_unqueued_upvote(outbox_id, place_id, memo):
+    """Hold an upvote memo whose outbox insert failed until the sweep requeues it.
+
+    Unlike a submission, an upvote leaves nothing in Mongo to rebuild its
+    entry from. If Redis is down too the memo is lost; that is logged.
+    """
+    entry = {"id": str(outbox_id), "place_id": str(place_id), "memo": memo}
+    try:
+        get_redis().rpush(UNQUEUED_UPVOTES_KEY, json.dumps(entry))
+    except redis.RedisError as exc:
+        current_app.logger.error("upvote memo %s lost: %s", outbox_id, exc)
+
+
+def requeue_unqueued_upvotes(batch_size=500):
+    """Move parked upvote memos into the outbox. Returns how many were recreated.
+
+    Entries are upserted under their original id before they leave the
+    list, so a sweep that dies halfway just upserts them again.
+    """
+    client = get_redis()
+    parked = client.lrange(UNQUEUED_UPVOTES_KEY, 0, batch_size - 1)
+    if not parked:
+        return 0
+    operations = []
+    for raw in parked:
+        entry = json.loads(raw)
+        operations.append(
+            _requeued_entry(
+                ObjectId(entry["id"]),
+                "upvote",
+                ObjectId(entry["place_id"]),
+                entry["memo"],
+            )
+        )
+    result = AnchorOutbox._get_collection().bulk_write(operations, ordered=False)
+    client.ltrim(UNQUEUED_UPVOTES_KEY, len(parked), -1)
+    return result.upserted_count
+
+
+def requeue_unqueued_submissions(grace_sec):
+    """Re-create the outbox entry of submissions whose enqueue never landed.
+
+    A submission saves its place before its outbox entry, so a failed
+    enqueue would leave the place pending forever. The entry id is part of
+    the place's provisional transaction_id, so the entry is recreated under
+    the same id and an upsert leaves entries that do exist untouched.
+    Returns how many entries were recreated.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_sec)
+    places = Place._get_collection().find(
+        {"anchoring_status": "pending", "created_at": {"$lte": cutoff}},
+        {"transaction_id": 1, "on_chain_data.raw_data.memo": 1},
+    )
+    operations = []
+    for place in places:
+        outbox_id = place.get("transaction_id", "").removeprefix(PROVISIONAL_PREFIX)
+        memo = ((place.get("on_chain_data") or {}).get("raw_data") or {}).get("memo")
+        if not ObjectId.is_valid(outbox_id) or not memo:
+            continue
+        operations.append(
+            _requeued_entry(ObjectId(outbox_id), "submit", place["_id"], memo)
+        )
+    if not operations:
+        return 0
+    result = AnchorOutbox._get_collection().bulk_write(operations, ordered=False)
+    return result.upserted_count
+
+
+def _claimable(now, kinds):
+    return {
+        "kind": {"$in": list(kinds)},
+        "status": "pending",
+        "$or": [{"locked_until": None}, {"locked_until": {"$lte": now}}],
+    }
+
+
+def claim_next_entry(lease_sec, kinds=("submit", "upvote")):
+    """Lease the oldest pending entry to this worker, or return None.
+
+    The lease makes claims safe across several workers and hands an entry
+    back if a worker dies mid-send.
+    """
+    now = datetime.now(timezone.utc)
+    return AnchorOutbox._get_collection().find_one_and_update(
+        _claimable(now, kinds),
+        {
+            "$set": {"locked_until": now + timedelta(seconds=lease_sec)},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def claim_upvote_batch(lease_sec, max_size, window_sec):
+    """Lease a batch of pending upvotes, or return [] if it isn't due yet.
+
+    A batch is due once max_size upvotes are waiting or the oldest has
+    waited window_sec. Only entries this worker actually leased come back.
+    """
+    outbox = AnchorOutbox._get_collection()
+    now = datetime.now(timezone.utc)
+    claimable = _claimable(now, ("upvote",))
+    candidates = list(
+        outbox.find(claimable, {"_id": 1, "created_at": 1})
+        .sort("created_at", 1)
+        .limit(max_size)
+    )
+    if not candidates:
+        return []
+    oldest = candidates[0]["created_at"].replace(tzinfo=timezone.utc)
+    if len(candidates) < max_size and now - oldest < timedelta(seconds=window_sec):
+        return []
+
+    batch_id = ObjectId()
+    outbox.update_many(
+        {"_id": {"$in": [c["_id"] for c in candidates]}, **claimable},
+        {
+            "$set": {
+                "locked_until": now + timedelta(seconds=lease_sec),
+                "batch_id": batch_id,
+            },
+            "$inc": {"attempts": 1},
+        },
+    )
+    return list(outbox.find({"batch_id": batch_id}).sort("created_at", 1))
+
+
+def _record_signature(entry, signature, proof=None):
+    if entry["kind"] == "submit":
+        update = {
+            "transaction_id": {"$literal": signature},
+            "anchoring_status": "anchored",
+            "on_chain_data": merge_raw_data({"signature": signature}),
+        }
+    else:
+        values = {"last_upvote_tx": signature}
+        if proof is not None:
+            values["last_upvote_proof"] = proof
+        update = {"on_chain_data": merge_raw_data(values)}
+    # indexed_at versions the place detail ETag, so it must move with the anchor.
+    update["indexed_at"] = "$$NOW"
+    Place._get_collection().update_one({"_id": entry["place_id"]}, [{"$set": update}])
+
+
+def anchor_entry(entry, solana, max_attempts, retry_base_sec):
+    """Send one claimed memo and write the outcome back. Returns True on success.
+
+    Delivery is at-least-once: if the worker dies after sending but before
+    marking the entry sent, the memo is sent again once the lease expires.
+    """
+    outbox = AnchorOutbox._get_collection()
+    now = datetime.now(timezone.utc)
+    try:
+        signature = solana.send_memo(entry["memo"])
+    except Exception as exc:
+        _record_failure(entry, exc, max_attempts, retry_base_sec, now)
+        return False
+
+    _record_signature(entry, signature)
+    outbox.update_one(
+        {"_id": entry["_id"]},
+        {"$set": {"status": "sent", "signature": signature, "sent_at": now}},
+    )
+    bump_places_version()
+    return True
+
+
+def anchor_batch(entries, solana, max_attempts, retry_base_sec):
+    """Anchor many upvote memos with one Merkle root memo.
+
+    Each entry keeps its inclusion proof, and the place's raw_data gets the
+    proof for its latest upvote, so any vote can be checked against the
+    root without touching the chain. Returns True on success.
+    """
+    outbox = AnchorOutbox._get_collection()
+    now = datetime.now(timezone.utc)
+    root, proofs = merkle_tree([entry["memo"] for entry in entries])
+    try:
+        signature = solana.send_memo(MERKLE_MEMO_PREFIX + root)
+    except Exception as exc:
+        for entry in entries:
+            _record_failure(entry, exc, max_attempts, retry_base_sec, now)
+        return False
+
+    for entry, proof in zip(entries, proofs):
+        _record_signature(
+            entry,
+            signature,
+            proof={"memo": entry["memo"], "merkle_root": root, "proof": proof},
+        )
+        outbox.update_one(
+            {"_id": entry["_id"]},
+            {
+                "$set": {
+                    "status": "sent",
+                    "signature": signature,
+                    "sent_at": now,
+                    "merkle_root": root,
+                    "proof": proof,
+                }
+            },
+        )
+    bump_places_version()
+    return True
+
+
+def _record_failure(entry, exc, max_attempts, retry_base_sec, now):
+    update = {"last_error": str(exc)}
+    failed = entry["attempts"] >= max_attempts
+    if failed:
+        update["status"] = "failed"
+    else:
+        delay = retry_base_sec * 2 ** (entry["attempts"] - 1)
+        update["locked_until"] = now + timedelta(seconds=delay)
+    AnchorOutbox._get_collection().update_one({"_id": entry["_id"]}, {"$set": update})
+    if failed and entry["kind"] == "submit":
+        Place._get_collection().update_one(
+            {"_id": entry["place_id"]},
+            {"$set": {"anchoring_status": "failed", "indexed_at": now}},
+        )
+        bump_places_version()
+
+
+def run_worker(app):
+    """Drain the outbox forever. Run one or more of these next to the API."""
+    with app.app_context():
+        config = app.config
+        solana = get_solana_service()
+        batching = config["ANCHOR_BATCH_UPVOTES"]
+        next_sweep = 0.0
+        while True:
+            if time.monotonic() >= next_sweep:
+                grace_sec = config["ANCHOR_SWEEP_GRACE_SEC"]
+                requeued = requeue_unqueued_submissions(grace_sec)
+                if requeued:
+                    app.logger.warning("requeued %d unqueued submissions", requeued)
+                requeued = requeue_unqueued_upvotes()
+                if requeued:
+                    app.logger.warning("requeued %d unqueued upvotes", requeued)
+                next_sweep = time.monotonic() + config["ANCHOR_SWEEP_INTERVAL_SEC"]
+            if batching:
+                batch = claim_upvote_batch(
+                    config["ANCHOR_LEASE_SEC"],
+                    config["ANCHOR_BATCH_MAX_SIZE"],
+                    config["ANCHOR_BATCH_WINDOW_SEC"],
+                )
+                if batch:
+                    anchored = anchor_batch(
+                        batch,
+                        solana,
+                        config["ANCHOR_MAX_ATTEMPTS"],
+                        config["ANCHOR_RETRY_BASE_SEC"],
+                    )
+                    outcome = "sent" if anchored else "not sent"
+                    app.logger.info("anchor batch of %d: %s", len(batch), outcome)
+                    continue
+            # With batching on, upvotes only ever leave through a batch.
+            kinds = ("submit",) if batching else ("submit", "upvote")
+            entry = claim_next_entry(config["ANCHOR_LEASE_SEC"], kinds)
+            if entry is None:
+                time.sleep(config["ANCHOR_POLL_INTERVAL_SEC"])
+                continue
+            anchored = anchor_entry(
+                entry,
+                solana,
+                config["ANCHOR_MAX_ATTEMPTS"],
+                config["ANCHOR_RETRY_BASE_SEC"],
+            )
+            outcome = "sent" if anchored else "not sent"
+            app.logger.info("anchor %s %s: %s", entry["kind"], entry["_id"], outcome)
@@ -0,0 +1,152 @@
+import math
+
+import redis
+from flask import current_app
+
+from services.rate_limit import get_redis, get_binary_redis
+from utils import geohash
+from utils.bbox import EARTH_RADIUS_METERS
+
+
+PLACES_VERSION_KEY = "places:version"
+PLACES_CACHE_STATS_KEY = "places:cache:stats"
+
+# Requested radii are rounded up to one of these so nearby zoom levels share keys.
+RADIUS_BUCKETS = (500, 1000, 2000, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+
+# How far the snapped circle may reach past its bucket, as a share of it.
+MAX_REACH_FRACTION = 0.125
+
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def get_places_version():
+    """Version of the place collection; bumped on every write."""
+    return int(get_redis().get(PLACES_VERSION_KEY) or 0)
+
+
+def bump_places_version():
+    """Invalidate everything derived from the place collection.
+
+    A failed bump is logged rather than raised: the write already landed and
+    stale pages age out within PLACES_CACHE_TTL_SEC anyway.
+    """
+    try:
+        return get_redis().incr(PLACES_VERSION_KEY)
+    except redis.RedisError as exc:
+        current_app.logger.warning("places cache invalidation failed: %s", exc)
+        return None
+
+
+def _cell_reach(precision):
+    """Meters from any point of a cell at precision to its center, at most.
+
+    Walking the meridian and then the parallel is never shorter than the
+    great circle, and equatorial degrees overstate every parallel.
+    """
+    lat_step, lon_step = geohash.cell_size(precision)
+    return math.ceil((lat_step + lon_step) / 2 * _METERS_PER_DEGREE)
+
+
+def quantize_viewport(lat, lon, radius, max_precision):
+    """Snap a query center to its geohash cell center and widen the radius.
+
+    Returns (lat, lon, radius, cell). The radius is rounded up to a bucket
+    and grown by the cell's reach, so the snapped circle contains the
+    requested one from anywhere in the cell and every client panning within
+    it can share one cached candidate set. Cells are the coarsest, up to
+    max_precision, whose reach stays within MAX_REACH_FRACTION of the
+    bucket, so wide viewports share widely without fetching much more.
+    """
+    bucket = next((b for b in RADIUS_BUCKETS if b >= radius), radius)
+    precision = next(
+        (
+            p
+            for p in range(1, max_precision)
+            if _cell_reach(p) <= bucket * MAX_REACH_FRACTION
+        ),
+        max_precision,
+    )
+    cell = geohash.encode(lat, lon, precision)
+    snapped_lat, snapped_lon = geohash.decode(cell)
+    return snapped_lat, snapped_lon, bucket + _cell_reach(precision), cell
+
+
+def current_places_version():
+    """get_places_version, or None (logged) when Redis is unreachable."""
+    try:
+        return get_places_version()
+    except redis.RedisError as exc:
+        current_app.logger.warning("places version unavailable: %s", exc)
+        return None
+
+
+def places_cache_key(version, cell, radius, params):
+    """Cache key for a quantized query at a given collection version.
+
+    Bumping the version orphans every cached entry at once and the old
+    entries simply expire.
+    """
+    parts = [f"{name}={params[name] or ''}" for name in sorted(params)]
+    return f"places:cache:{version}:{cell}:{radius}:" + "&".join(parts)
+
+
+def cache_get(key):
+    """Return the cached body bytes or None; see record_cache_lookup."""
+    try:
+        return get_binary_redis().get(key)
+    except redis.RedisError as exc:
+        current_app.logger.warning("places cache read failed: %s", exc)
+        return None
+
+
+def record_cache_lookup(outcome):
+    """Count a lookup as one of "hits", "misses" or "bypasses".
+
+    A bypass is an entry that only says to skip the cache, so it saved
+    nothing and would inflate the hit ratio if counted as a hit.
+    """
+    try:
+        get_redis().hincrby(PLACES_CACHE_STATS_KEY, outcome, 1)
+    except redis.RedisError as exc:
+        current_app.logger.warning("places cache stats update failed: %s", exc)
+
+
+def cache_set(key, body, ttl_sec):
+    """Store serialized response bytes for ttl_sec seconds."""
+    try:
+        get_binary_redis().set(key, body, ex=ttl_sec)
+    except redis.RedisError as exc:
+        current_app.logger.warning("places cache write failed: %s", exc)
+
+
+def tile_cache_get(z, x, y, layer="tiles"):
+    """Return (tile bytes or None, cache key or None) for the current version."""
+    try:
+        key = f"{layer}:{get_places_version()}:{z}/{x}/{y}"
+        return get_binary_redis().get(key), key
+    except redis.RedisError as exc:
+        current_app.logger.warning("tile cache read failed: %s", exc)
+        return None, None
+
+
+def tile_cache_set(key, tile, ttl_sec):
+    try:
+        get_binary_redis().set(key, tile, ex=ttl_sec)
+    except redis.RedisError as exc:
+        current_app.logger.warning("tile cache write failed: %s", exc)
+
+
+def get_cache_stats():
+    """Hit/miss counters since the last reset, for tuning the quantization."""
+    stats = get_redis().hgetall(PLACES_CACHE_STATS_KEY)
+    hits = int(stats.get("hits", 0))
+    misses = int(stats.get("misses", 0))
+    bypasses = int(stats.get("bypasses", 0))
+    lookups = hits + misses + bypasses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "bypasses": bypasses,
+        "hit_ratio": hits / lookups if lookups else None,
+    }
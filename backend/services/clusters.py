@@ -0,0 +1,82 @@
+import threading
+import time
+
+import redis
+from flask import current_app
+
+from models import Place
+from services.rate_limit import get_redis
+from utils.cluster_grid import ClusterGrid
+
+
+# Bumped only by writes that move places in or out of the approved set, so
+# upvotes don't force every worker to reload its grid.
+PLACES_GEO_VERSION_KEY = "places:geo:version"
+
+_lock = threading.Lock()
+_grid = None
+_grid_version = None
+_built_at = 0.0
+
+
+def _load_grid():
+    grid = ClusterGrid()
+    rows = Place.objects(status="approved").only("location", "upvote_count").as_pymongo()
+    for row in rows:
+        lon, lat = row["location"]["coordinates"]
+        grid.upsert(str(row["_id"]), lon, lat, row.get("upvote_count", 0))
+    return grid
+
+
+def _current_version():
+    try:
+        return int(get_redis().get(PLACES_GEO_VERSION_KEY) or 0)
+    except redis.RedisError as exc:
+        current_app.logger.warning("cluster grid version unavailable: %s", exc)
+        return _grid_version
+
+
+def query_clusters(zoom, bbox, limit):
+    """Clusters of approved places in bbox, from this worker's grid.
+
+    The grid is reloaded from Mongo when another worker has changed the
+    approved set, or after CLUSTER_INDEX_MAX_AGE_SEC so upvote-ranked
+    representatives and direct database edits catch up.
+    """
+    global _grid, _grid_version, _built_at
+    version = _current_version()
+    max_age = current_app.config["CLUSTER_INDEX_MAX_AGE_SEC"]
+    with _lock:
+        stale = time.monotonic() - _built_at > max_age
+        if _grid is None or version != _grid_version or stale:
+            # The version is read before loading, so a write that lands
+            # mid-load leaves us behind and triggers another reload.
+            _grid = _load_grid()
+            _grid_version = version
+            _built_at = time.monotonic()
+        return _grid.clusters(zoom, *bbox, limit)
+
+
+def track_place_change(place):
+    """Apply a submitted or moderated place to the grid in place.
+
+    Other workers see the version bump and reload on their next query; this
+    worker only reloads if it missed someone else's bump in between.
+    """
+    global _grid_version
+    with _lock:
+        try:
+            version = get_redis().incr(PLACES_GEO_VERSION_KEY)
+        except redis.RedisError as exc:
+            current_app.logger.warning("cluster grid version bump failed: %s", exc)
+            version = None
+        if _grid is None:
+            return
+        place_id = str(place.id)
+        if place.status == "approved":
+            lon, lat = place.location.coordinates
+            _grid.upsert(place_id, lon, lat, place.upvote_count or 0)
+        else:
+            _grid.remove(place_id)
+        if version is not None and _grid_version == version - 1:
+            _grid_version = version
@@ -0,0 +1,67 @@
+import redis
+from flask import current_app
+
+from models import Place
+from services.rate_limit import get_redis
+
+
+MODERATION_PENDING_COUNT_KEY = "moderation:pending:count"
+
+# Adjusts the counter only while it exists: a write racing an expired
+# counter must not recreate it without a TTL from a lone +1/-1.
+_ADJUST_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+_adjust_script = None
+
+
+def _adjust(delta):
+    global _adjust_script
+    client = get_redis()
+    if _adjust_script is None or _adjust_script.registered_client is not client:
+        _adjust_script = client.register_script(_ADJUST_LUA)
+    _adjust_script(keys=[MODERATION_PENDING_COUNT_KEY], args=[delta])
+
+
+def track_pending_change(old_status, new_status):
+    """Keep the pending counter in step with a place entering or leaving pending.
+
+    old_status is None for a new place. A failed update is logged; the
+    counter is recounted from Mongo once MODERATION_COUNT_TTL_SEC passes.
+    """
+    delta = (new_status == "pending") - (old_status == "pending")
+    if not delta:
+        return
+    try:
+        _adjust(delta)
+    except redis.RedisError as exc:
+        current_app.logger.warning("pending count update failed: %s", exc)
+
+
+def pending_count():
+    """Number of places awaiting moderation, or None when Redis is unreachable.
+
+    Served from a Redis counter that writes keep current. When it has
+    expired it is recounted over the (status, created_at) index, so the
+    queue never counts the collection per request.
+    """
+    try:
+        client = get_redis()
+        count = client.get(MODERATION_PENDING_COUNT_KEY)
+        if count is not None:
+            return max(int(count), 0)
+        count = Place._get_collection().count_documents({"status": "pending"})
+        client.set(
+            MODERATION_PENDING_COUNT_KEY,
+            count,
+            ex=current_app.config["MODERATION_COUNT_TTL_SEC"],
+            nx=True,
+        )
+        return count
+    except redis.RedisError as exc:
+        current_app.logger.warning("pending count unavailable: %s", exc)
+        return None
@@ -1,16 +1,69 @@
+import os
+import threading
 import time
+from collections import OrderedDict
+
 import redis
 
 
 _redis_client = None
+_redis_binary_client = None
+_write_slot_script = None
+
+# Keys Redis recently rate limited, mapped to the earliest time the limit can
+# lift. Repeat offenders are turned away from here without a round trip;
+# anything not in it is always decided by Redis.
+LOCAL_LIMITED_MAX_KEYS = 10000
+_local_limited = OrderedDict()
+_local_lock = threading.Lock()
+_decisions = {"local": 0, "remote": 0}
+
+# Outcomes of acquire_write_slot.
+RATE_LIMITED = "rate_limited"
+DUPLICATE = "duplicate"
+
+# Fixed windows reset at every multiple of window_sec, so a client can fit
+# twice the limit around a boundary. Sliding windows also count the previous
+# window, weighted by how much of it still overlaps the last window_sec.
+FIXED_WINDOW = "fixed"
+SLIDING_WINDOW = "sliding"
+RATE_LIMIT_STRATEGIES = (FIXED_WINDOW, SLIDING_WINDOW)
+
+# KEYS: current window counter, previous window counter, optional dedupe key.
+# ARGV: limit, counter ttl, dedupe ttl, weight of the previous window (0 for
+# fixed windows, which then never read it). The counter only moves when the
+# write goes ahead, so rejected and duplicate requests don't use up a slot.
+# A rejection also returns both counts so the caller can tell when it lifts.
+_WRITE_SLOT_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = 0
+local weight = tonumber(ARGV[4])
+if weight > 0 then
+    previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+end
+if current + weight * previous >= tonumber(ARGV[1]) then
+    return {1, current, previous}
+end
+if #KEYS > 2 then
+    if not redis.call('SET', KEYS[3], '1', 'NX', 'EX', ARGV[3]) then
+        return {2}
+    end
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {0}
+"""
+_WRITE_SLOT_OUTCOMES = {0: None, 1: RATE_LIMITED, 2: DUPLICATE}
 
 
 def init_redis(app):
-    global _redis_client
+    global _redis_client, _redis_binary_client, _write_slot_script
     redis_url = app.config.get("REDIS_URL")
     if not redis_url:
         raise RuntimeError("REDIS_URL is not configured")
     _redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+    _redis_binary_client = redis.Redis.from_url(redis_url)
+    _write_slot_script = _redis_client.register_script(_WRITE_SLOT_LUA)
 
 
 def get_redis():
@@ -19,18 +72,105 @@ def get_redis():
     return _redis_client
 
 
-def is_rate_limited(key, limit, window_sec):
-    client = get_redis()
-    now = int(time.time())
-    window_key = f"rate:{key}:{now // window_sec}"
-    pipeline = client.pipeline()
-    pipeline.incr(window_key, 1)
-    pipeline.expire(window_key, window_sec)
-    count, _ = pipeline.execute()
-    return count > limit
+def get_binary_redis():
+    """Client that returns raw bytes, for cached binary payloads."""
+    if _redis_binary_client is None:
+        raise RuntimeError("Redis client not initialized")
+    return _redis_binary_client
+
+
+def _limit_lifts_at(now, window_sec, strategy, limit, current, previous):
+    """Earliest time a limited key could be allowed again.
+
+    Counts only grow within a window and the previous window's weight only
+    shrinks, so no request is turned away locally that Redis would allow.
+    """
+    window_end = (now // window_sec + 1) * window_sec
+    if strategy == FIXED_WINDOW or current >= limit:
+        return window_end
+    # The weighted estimate current + previous * (1 - elapsed / window_sec)
+    # drops below limit once this much of the window has passed.
+    elapsed = window_sec * (1 - (limit - current) / previous)
+    return window_end - window_sec + elapsed
 
 
-def check_and_set_dedupe(key, ttl_sec):
+def _locally_limited(key, now):
+    with _local_lock:
+        lifts_at = _local_limited.get(key)
+        if lifts_at is None:
+            _decisions["remote"] += 1
+            return False
+        if lifts_at <= now:
+            del _local_limited[key]
+            _decisions["remote"] += 1
+            return False
+        _local_limited.move_to_end(key)
+        _decisions["local"] += 1
+        return True
+
+
+def _remember_limited(key, lifts_at):
+    with _local_lock:
+        _local_limited[key] = lifts_at
+        _local_limited.move_to_end(key)
+        while len(_local_limited) > LOCAL_LIMITED_MAX_KEYS:
+            _local_limited.popitem(last=False)
+
+
+def get_rate_limit_stats():
+    """This worker's count of requests decided locally versus by Redis."""
+    with _local_lock:
+        return {
+            "pid": os.getpid(),
+            "local": _decisions["local"],
+            "remote": _decisions["remote"],
+            "limited_keys": len(_local_limited),
+        }
+
+
+def acquire_write_slot(
+    key,
+    limit,
+    window_sec,
+    dedupe_key=None,
+    dedupe_ttl_sec=None,
+    strategy=SLIDING_WINDOW,
+):
+    """Rate-limit check, dedupe and counter increment in one atomic round trip.
+
+    Returns None when the write may proceed, RATE_LIMITED or DUPLICATE.
+    Without dedupe_key only the rate limit is applied. Either strategy keeps
+    one counter per window, so a fingerprint has at most two live keys.
+    """
+    if strategy not in RATE_LIMIT_STRATEGIES:
+        raise ValueError(f"unknown rate limit strategy: {strategy}")
+    now = time.time()
+    if _locally_limited(key, now):
+        return RATE_LIMITED
     client = get_redis()
-    added = client.set(key, "1", nx=True, ex=ttl_sec)
-    return added is None
+    window = int(now // window_sec)
+    keys = [f"rate:{key}:{window}", f"rate:{key}:{window - 1}"]
+    if strategy == SLIDING_WINDOW:
+        weight = 1 - (now % window_sec) / window_sec
+        counter_ttl = window_sec * 2
+    else:
+        weight = 0
+        counter_ttl = window_sec
+    if dedupe_key:
+        keys.append(dedupe_key)
+    result = _write_slot_script(
+        keys=keys,
+        args=[limit, counter_ttl, dedupe_ttl_sec or window_sec, weight],
+        client=client,
+    )
+    outcome = _WRITE_SLOT_OUTCOMES[result[0]]
+    if outcome == RATE_LIMITED:
+        current, previous = result[1], result[2]
+        _remember_limited(
+            key, _limit_lifts_at(now, window_sec, strategy, limit, current, previous)
+        )
+    return outcome
+
+
+def is_rate_limited(key, limit, window_sec, strategy=SLIDING_WINDOW):
+    return acquire_write_slot(key, limit, window_sec, strategy=strategy) == RATE_LIMITED
@@ -0,0 +1,138 @@
+from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from models import Place, SafetyCell
+from utils.safety_grid import cells_in_radius, grid_precision, place_cells
+from utils.validation import ALLOWED_STATUS
+
+
+def cell_id(status, geohash):
+    return f"{status}:{geohash}"
+
+
+# Upvote flushes a cell remembers having taken; a retried flush only ever
+# repeats the most recent one.
+FLUSH_HISTORY = 16
+
+_DUPLICATE_KEY = 11000
+
+
+def _cell_update(status, geohash, place_delta, upvote_delta, flush_id=None):
+    query = {"_id": cell_id(status, geohash)}
+    update = {
+        "$inc": {"place_count": place_delta, "total_upvotes": upvote_delta},
+        "$setOnInsert": {
+            "geohash": geohash,
+            "precision": len(geohash),
+            "status": status,
+        },
+    }
+    if flush_id:
+        # A cell that already took this flush no longer matches, and the
+        # upsert then fails on the duplicate _id instead of adding again.
+        query["upvote_flushes"] = {"$ne": flush_id}
+        update["$push"] = {
+            "upvote_flushes": {"$each": [flush_id], "$slice": -FLUSH_HISTORY}
+        }
+    return UpdateOne(query, update, upsert=True)
+
+
+def _cell_updates(coordinates, status, place_delta, upvote_delta):
+    lon, lat = coordinates
+    return [
+        _cell_update(status, geohash, place_delta, upvote_delta)
+        for geohash in place_cells(lat, lon)
+    ]
+
+
+def _apply(operations):
+    # The grid is derived data: a failed update is logged rather than failing
+    # the write that caused it, and rebuild_safety_grid() repairs any drift.
+    if not operations:
+        return
+    try:
+        SafetyCell._get_collection().bulk_write(operations, ordered=False)
+    except BulkWriteError as exc:
+        errors = [
+            error
+            for error in exc.details.get("writeErrors", [])
+            if error.get("code") != _DUPLICATE_KEY
+        ]
+        if errors or exc.details.get("writeConcernErrors"):
+            current_app.logger.warning("safety grid update failed: %s", exc)
+    except PyMongoError as exc:
+        current_app.logger.warning("safety grid update failed: %s", exc)
+
+
+def record_place_added(coordinates, status, upvotes=0):
+    _apply(_cell_updates(coordinates, status, 1, upvotes))
+
+
+def record_status_change(coordinates, old_status, new_status, upvotes):
+    if old_status == new_status:
+        return
+    _apply(
+        _cell_updates(coordinates, old_status, -1, -upvotes)
+        + _cell_updates(coordinates, new_status, 1, upvotes)
+    )
+
+
+def record_upvotes(places, flush_id=None):
+    """Add upvotes to the grid; places is an iterable of (coordinates, status, delta).
+
+    With a flush_id each cell takes the flush at most once, so a flush
+    retried after a crash can't count its upvotes twice.
+    """
+    totals = {}
+    for (lon, lat), status, delta in places:
+        for geohash in place_cells(lat, lon):
+            totals[status, geohash] = totals.get((status, geohash), 0) + delta
+    _apply(
+        [
+            _cell_update(status, geohash, 0, delta, flush_id)
+            for (status, geohash), delta in totals.items()
+            if delta
+        ]
+    )
+
+
+def rebuild_safety_grid():
+    """Recompute every cell from the places collection. Returns cells written."""
+    totals = {}
+    rows = Place.objects.only("location", "status", "upvote_count").as_pymongo()
+    for row in rows:
+        lon, lat = row["location"]["coordinates"]
+        status = row.get("status", "pending")
+        for geohash in place_cells(lat, lon):
+            cell = totals.setdefault(
+                cell_id(status, geohash),
+                {
+                    "geohash": geohash,
+                    "precision": len(geohash),
+                    "status": status,
+                    "place_count": 0,
+                    "total_upvotes": 0,
+                },
+            )
+            cell["place_count"] += 1
+            cell["total_upvotes"] += row.get("upvote_count") or 0
+    collection = SafetyCell._get_collection()
+    collection.delete_many({})
+    if totals:
+        collection.insert_many([{"_id": key, **cell} for key, cell in totals.items()])
+    return len(totals)
+
+
+def region_stats(lat, lon, radius, status=None):
+    """(place_count, total_upvotes, precision) summed from grid cells in radius."""
+    precision = grid_precision(lat, radius)
+    cells = cells_in_radius(lat, lon, radius, precision)
+    statuses = [status] if status else sorted(ALLOWED_STATUS)
+    ids = [cell_id(s, geohash) for s in statuses for geohash in cells]
+    place_count = total_upvotes = 0
+    projection = {"place_count": 1, "total_upvotes": 1}
+    for cell in SafetyCell._get_collection().find({"_id": {"$in": ids}}, projection):
+        place_count += cell.get("place_count", 0)
+        total_upvotes += cell.get("total_upvotes", 0)
+    return place_count, total_upvotes, precision
@@ -0,0 +1,47 @@
+import threading
+
+import redis
+from flask import current_app
+
+from models import Place, SUMMARY_FIELDS
+from services.cache import get_places_version
+from services.upvotes import refresh_scores
+
+try:
+    from utils.spatial_snapshot import PlaceSnapshot
+except Exception:  # pragma: no cover
+    PlaceSnapshot = None
+
+
+_lock = threading.Lock()
+_snapshot = None
+_snapshot_version = None
+
+
+def get_snapshot():
+    """This worker's snapshot of place summaries, or None to use Mongo.
+
+    The snapshot is rebuilt whenever the places version in Redis has moved
+    since it was taken. None means the snapshot is disabled, NumPy is
+    missing, or the version can't be read; callers then query Mongo as usual.
+    """
+    global _snapshot, _snapshot_version
+    if not current_app.config["SPATIAL_SNAPSHOT_ENABLED"] or PlaceSnapshot is None:
+        return None
+    try:
+        version = get_places_version()
+    except redis.RedisError as exc:
+        current_app.logger.warning("spatial snapshot version unavailable: %s", exc)
+        return None
+    if _snapshot is not None and version == _snapshot_version:
+        return _snapshot
+    with _lock:
+        if _snapshot is None or version != _snapshot_version:
+            # Read before loading: a write that lands mid-load bumps the
+            # version again and the next request rebuilds.
+            rows = list(Place.objects.only(*SUMMARY_FIELDS).as_pymongo())
+            # Decay scores as of the build for the heatmap; list reads refresh
+            # them again, and add write-behind upvotes, per request.
+            _snapshot = PlaceSnapshot(refresh_scores(rows, deltas={}))
+            _snapshot_version = version
+        return _snapshot
@@ -1,7 +1,16 @@
 import json
 import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
 
+import redis
+from flask import current_app
+
+from services.rate_limit import get_redis
+
 try:
     from solana.rpc.api import Client
     from solana.transaction import Transaction
@@ -18,20 +27,71 @@ except Exception:  # pragma: no cover
 
 MEMO_PROGRAM_ID = "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr"
 
+SOLANA_RPC_STATS_KEY = "solana:rpc:stats"
+
+
+@lru_cache(maxsize=None)
+def _load_keypair(keypair_path):
+    key_data = json.loads(Path(keypair_path).read_text())
+    return Keypair.from_bytes(bytes(key_data))
+
+
+def _record_rpc_timing(method, elapsed_ms, ok):
+    current_app.logger.debug("solana %s took %.1fms ok=%s", method, elapsed_ms, ok)
+    try:
+        pipeline = get_redis().pipeline()
+        pipeline.hincrby(SOLANA_RPC_STATS_KEY, f"{method}:calls", 1)
+        pipeline.hincrbyfloat(SOLANA_RPC_STATS_KEY, f"{method}:total_ms", elapsed_ms)
+        if not ok:
+            pipeline.hincrby(SOLANA_RPC_STATS_KEY, f"{method}:errors", 1)
+        pipeline.execute()
+    except redis.RedisError as exc:
+        current_app.logger.warning("solana rpc stats write failed: %s", exc)
+
 
 class SolanaService:
-    def __init__(self, rpc_url, keypair_path):
+    def __init__(self, rpc_url, keypair_path, timeout_sec=10, blockhash_ttl_sec=20):
         if Client is None:
             raise RuntimeError("solana-py is not installed")
         if not keypair_path:
             raise RuntimeError("SOLANA_KEYPAIR_PATH is not configured")
 
-        self.client = Client(rpc_url)
-        self.keypair = self._load_keypair(keypair_path)
+        # The client's HTTP provider holds one keep-alive session, so reusing
+        # the service reuses the connection to the RPC node.
+        self.client = Client(rpc_url, timeout=timeout_sec)
+        self.keypair = _load_keypair(keypair_path)
+        self.blockhash_ttl_sec = blockhash_ttl_sec
+        self._blockhash = None
+        self._blockhash_expires = 0.0
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = getattr(self.client, method)(*args, **kwargs)
+            ok = True
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _record_rpc_timing(method, elapsed_ms, ok)
+
+    def recent_blockhash(self):
+        """Latest blockhash, reused for blockhash_ttl_sec.
 
-    def _load_keypair(self, keypair_path):
-        key_data = json.loads(Path(keypair_path).read_text())
-        return Keypair.from_bytes(bytes(key_data))
+        A blockhash stays valid for about a minute, so a short reuse window
+        saves one RPC round trip per memo without risking expiry.
+        """
+        with self._lock:
+            if self._blockhash is None or time.monotonic() >= self._blockhash_expires:
+                response = self._call("get_latest_blockhash")
+                self._blockhash = response.value.blockhash
+                self._blockhash_expires = time.monotonic() + self.blockhash_ttl_sec
+            return self._blockhash
+
+    def _forget_blockhash(self):
+        with self._lock:
+            self._blockhash = None
 
     def send_memo(self, memo_text):
         memo_bytes = memo_text.encode("utf-8")
@@ -43,11 +103,63 @@ class SolanaService:
         )
 
         tx = Transaction().add(instruction)
-        response = self.client.send_transaction(tx, self.keypair)
-        signature = response.get("result")
+        try:
+            response = self._call(
+                "send_transaction",
+                tx,
+                self.keypair,
+                recent_blockhash=self.recent_blockhash(),
+            )
+        except Exception:
+            # The cached blockhash may be the reason; fetch a fresh one next time.
+            self._forget_blockhash()
+            raise
+        signature = response.value
         if not signature:
+            self._forget_blockhash()
             raise RuntimeError(f"Solana transaction failed: {response}")
-        return signature
+        return str(signature)
+
+
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+
+
+def get_solana_service():
+    """This process's SolanaService, built on first use.
+
+    The service is rebuilt after a fork, so a pre-forking server never shares
+    one HTTP connection between worker processes.
+    """
+    global _service, _service_pid
+    pid = os.getpid()
+    if _service is not None and _service_pid == pid:
+        return _service
+    with _service_lock:
+        if _service is None or _service_pid != pid:
+            config = current_app.config
+            _service = SolanaService(
+                config["SOLANA_RPC_URL"],
+                config["SOLANA_KEYPAIR_PATH"],
+                timeout_sec=config["SOLANA_RPC_TIMEOUT_SEC"],
+                blockhash_ttl_sec=config["SOLANA_BLOCKHASH_TTL_SEC"],
+            )
+            _service_pid = pid
+        return _service
+
+
+def get_rpc_stats():
+    """Call count, error count and mean latency per RPC method."""
+    stats = {}
+    for field, value in get_redis().hgetall(SOLANA_RPC_STATS_KEY).items():
+        method, name = field.rsplit(":", 1)
+        stats.setdefault(method, {"calls": 0, "errors": 0, "total_ms": 0.0})
+        stats[method][name] = float(value) if name == "total_ms" else int(value)
+    for method_stats in stats.values():
+        calls = method_stats["calls"]
+        method_stats["mean_ms"] = method_stats["total_ms"] / calls if calls else None
+    return stats
 
 
 def hash_payload(*parts):
@@ -0,0 +1,246 @@
+import time
+from datetime import datetime, timezone
+
+import redis
+from bson import ObjectId
+from flask import current_app
+from pymongo import UpdateOne
+
+from models import Place
+from services.cache import bump_places_version
+from services.rate_limit import get_redis
+from services.safety_grid import record_upvotes
+from utils.score_decay import decayed_weight
+
+
+# Write-behind upvotes: deltas accumulate here per place id until the flusher
+# renames the hash to UPVOTES_FLUSHING_KEY and applies it to Mongo.
+UPVOTES_PENDING_KEY = "upvotes:pending"
+UPVOTES_FLUSHING_KEY = "upvotes:flushing"
+UPVOTES_FLUSH_LOCK_KEY = "upvotes:flush:lock"
+
+# Field of the flushing hash that names the flush; never a place id.
+_FLUSH_ID_FIELD = "_flush_id"
+
+# Place fields a safety score is computed from; project them wherever scores
+# are refreshed at read time. upvote_flush_id tells which unflushed deltas
+# the document already holds.
+SCORE_FIELDS = ("upvote_count", "upvote_weight", "upvote_weight_at", "upvote_flush_id")
+
+
+def compute_place_safety_score(upvote_weight):
+    return min(100.0, float(upvote_weight) * 2.0)
+
+
+def _half_life_sec():
+    return current_app.config["SAFETY_SCORE_HALF_LIFE_DAYS"] * 86400
+
+
+def current_upvote_weight(raw, now=None):
+    """A place's decayed upvote weight as of now.
+
+    The weight is stored as of upvote_weight_at and only decayed when read,
+    so upvotes stay O(1) and nothing rescans the collection. Places the
+    backfill hasn't reached count every upvote at full weight.
+    """
+    weight = raw.get("upvote_weight")
+    updated_at = raw.get("upvote_weight_at")
+    if weight is None or updated_at is None:
+        return float(raw.get("upvote_count") or 0)
+    now = now or datetime.now(timezone.utc)
+    return decayed_weight(weight, updated_at, now, _half_life_sec())
+
+
+def decayed_weight_expression():
+    """Aggregation expression for current_upvote_weight at $$NOW."""
+    half_life_ms = _half_life_sec() * 1000
+    weight = {"$ifNull": ["$upvote_weight", {"$ifNull": ["$upvote_count", 0]}]}
+    if half_life_ms <= 0:
+        return weight
+    elapsed_ms = {"$subtract": ["$$NOW", {"$ifNull": ["$upvote_weight_at", "$$NOW"]}]}
+    factor = {"$pow": [0.5, {"$divide": [elapsed_ms, half_life_ms]}]}
+    return {"$multiply": [weight, factor]}
+
+
+def safety_score_expression(weight=None):
+    """Aggregation expression for compute_place_safety_score."""
+    weight = weight or decayed_weight_expression()
+    return {"$min": [100.0, {"$multiply": [{"$toDouble": weight}, 2.0]}]}
+
+
+def upvote_pipeline(delta=1, flush_id=None):
+    """Update pipeline that applies delta upvotes in a single atomic write.
+
+    The stored weight is decayed to now before delta is added, and stages
+    run in order, so the safety score is computed from the new weight the
+    same way compute_place_safety_score does.
+    """
+    applied = {
+        "upvote_count": {"$add": [{"$ifNull": ["$upvote_count", 0]}, delta]},
+        "upvote_weight": {"$add": [decayed_weight_expression(), delta]},
+        "upvote_weight_at": "$$NOW",
+        "indexed_at": "$$NOW",
+    }
+    if flush_id:
+        applied["upvote_flush_id"] = flush_id
+    return [
+        {"$set": applied},
+        {"$set": {"safety_score": safety_score_expression("$upvote_weight")}},
+    ]
+
+
+def write_behind_enabled():
+    return current_app.config["UPVOTE_WRITE_BEHIND"]
+
+
+def _unflushed(raw, pending, flushing, flush_id):
+    """Delta a row read from Mongo is still missing.
+
+    A flush writes its deltas to Mongo a moment before it deletes the
+    flushing hash; a row already stamped with that flush id holds them.
+    """
+    if flush_id is not None and raw.get("upvote_flush_id") == flush_id:
+        flushing = None
+    return int(pending or 0) + int(flushing or 0)
+
+
+def record_upvote(raw):
+    """Count one upvote for a place row in Redis; returns its unflushed delta."""
+    field = str(raw["_id"])
+    pipeline = get_redis().pipeline()
+    pipeline.hincrby(UPVOTES_PENDING_KEY, field, 1)
+    pipeline.hmget(UPVOTES_FLUSHING_KEY, [_FLUSH_ID_FIELD, field])
+    pending, (flush_id, flushing) = pipeline.execute()
+    return _unflushed(raw, pending, flushing, flush_id)
+
+
+def pending_upvotes(raw_places):
+    """Unflushed upvote deltas of rows by id; rows without one are left out."""
+    if not raw_places or not write_behind_enabled():
+        return {}
+    fields = [str(raw["_id"]) for raw in raw_places]
+    try:
+        pipeline = get_redis().pipeline()
+        pipeline.hmget(UPVOTES_PENDING_KEY, fields)
+        pipeline.hmget(UPVOTES_FLUSHING_KEY, [_FLUSH_ID_FIELD, *fields])
+        pending, (flush_id, *flushing) = pipeline.execute()
+    except redis.RedisError as exc:
+        current_app.logger.warning("pending upvotes unavailable: %s", exc)
+        return {}
+    deltas = {}
+    for raw, field, a, b in zip(raw_places, fields, pending, flushing):
+        delta = _unflushed(raw, a, b, flush_id)
+        if delta:
+            deltas[field] = delta
+    return deltas
+
+
+def refresh_scores(raw_places, deltas=None):
+    """Bring upvote_count and safety_score of raw rows up to date in place.
+
+    Adds unflushed write-behind upvotes (looked up unless deltas is given)
+    and decays each score to now. Rows need SCORE_FIELDS.
+    """
+    if deltas is None:
+        deltas = pending_upvotes(raw_places)
+    now = datetime.now(timezone.utc)
+    for raw in raw_places:
+        delta = deltas.get(str(raw["_id"]), 0)
+        weight = current_upvote_weight(raw, now) + delta
+        raw["upvote_count"] = (raw.get("upvote_count") or 0) + delta
+        raw["safety_score"] = compute_place_safety_score(weight)
+    return raw_places
+
+
+def backfill_upvote_weights():
+    """Give places written before score decay a weight. Returns places updated.
+
+    Existing upvotes are dated to the place's last write, so long-idle
+    places start out already decayed.
+    """
+    last_write = {"$ifNull": ["$indexed_at", {"$ifNull": ["$created_at", "$$NOW"]}]}
+    result = Place._get_collection().update_many(
+        {"upvote_weight": None},
+        [
+            {
+                "$set": {
+                    "upvote_weight": {"$toDouble": {"$ifNull": ["$upvote_count", 0]}},
+                    "upvote_weight_at": last_write,
+                }
+            },
+            {"$set": {"safety_score": safety_score_expression()}},
+        ],
+    )
+    if result.modified_count:
+        bump_places_version()
+    return result.modified_count
+
+
+def flush_pending_upvotes(lock_sec=60):
+    """Apply accumulated deltas to Mongo with one bulk_write. Returns places updated.
+
+    The pending hash is renamed before it is read, so upvotes arriving
+    mid-flush start a fresh hash. The flushing hash is only deleted after
+    the write, and each place and grid cell records the flush ids it took,
+    so a flush retried after a crash applies every delta exactly once and
+    readers skip the deltas of places that already took it.
+    """
+    client = get_redis()
+    if not client.set(UPVOTES_FLUSH_LOCK_KEY, "1", nx=True, ex=lock_sec):
+        return 0
+    try:
+        if not client.exists(UPVOTES_FLUSHING_KEY):
+            try:
+                client.rename(UPVOTES_PENDING_KEY, UPVOTES_FLUSHING_KEY)
+            except redis.ResponseError:
+                # Nothing pending.
+                return 0
+        client.hsetnx(UPVOTES_FLUSHING_KEY, _FLUSH_ID_FIELD, str(ObjectId()))
+        deltas = client.hgetall(UPVOTES_FLUSHING_KEY)
+        flush_id = deltas.pop(_FLUSH_ID_FIELD)
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(place_id), "upvote_flush_id": {"$ne": flush_id}},
+                upvote_pipeline(int(delta), flush_id),
+            )
+            for place_id, delta in deltas.items()
+            if int(delta)
+        ]
+        if operations:
+            places = Place._get_collection()
+            places.bulk_write(operations, ordered=False)
+            rows = places.find(
+                {"_id": {"$in": [ObjectId(place_id) for place_id in deltas]}},
+                {"location": 1, "status": 1},
+            )
+            record_upvotes(
+                (
+                    (
+                        row["location"]["coordinates"],
+                        row.get("status", "pending"),
+                        int(deltas[str(row["_id"])]),
+                    )
+                    for row in rows
+                ),
+                flush_id,
+            )
+        client.delete(UPVOTES_FLUSHING_KEY)
+        if operations:
+            bump_places_version()
+        return len(operations)
+    finally:
+        client.delete(UPVOTES_FLUSH_LOCK_KEY)
+
+
+def run_flusher(app):
+    """Flush write-behind upvotes forever, every UPVOTE_FLUSH_INTERVAL_SEC."""
+    with app.app_context():
+        interval = app.config["UPVOTE_FLUSH_INTERVAL_SEC"]
+        while True:
+            try:
+                flushed = flush_pending_upvotes()
+                if flushed:
+                    app.logger.info("flushed upvotes for %d places", flushed)
+            except Exception:
+                app.logger.exception("upvote flush failed")
+            time.sleep(interval)
@@ -0,0 +1,33 @@
+"""Bring collection indexes in line with the models: python sync_indexes.py
+
+Drops indexes the models no longer declare, then creates the missing ones.
+Stale 2dsphere indexes, which break $geoNear, are already dropped by
+migrate.py before startup; this cleans up the rest.
+"""
+
+from app import app
+from models import AnchorOutbox, Place, SafetyCell
+
+
+def sync_indexes(document):
+    collection = document._get_collection()
+    existing = {
+        tuple(spec["key"]): name
+        for name, spec in collection.index_information().items()
+    }
+    dropped = []
+    for key in document.compare_indexes()["extra"]:
+        name = existing.get(tuple(key))
+        if name and name != "_id_":
+            collection.drop_index(name)
+            dropped.append(name)
+    document.ensure_indexes()
+    return dropped
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        for document in (Place, AnchorOutbox, SafetyCell):
+            for name in sync_indexes(document):
+                print(f"Dropped {document._meta['collection']}.{name}")
+        print("Indexes in sync")
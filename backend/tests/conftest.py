@@ -0,0 +1,78 @@
+import os
+from collections import OrderedDict
+
+import pytest
+from flask import Flask
+from mongoengine import connect, disconnect
+
+from config import Config
+from models import AnchorOutbox, Place, SafetyCell
+from routes.interactions import bp as interactions_bp
+from routes.moderation import bp as moderation_bp
+from routes.places import bp as places_bp
+from routes.safety import bp as safety_bp
+from services import rate_limit
+from utils.json_provider import FastJSONProvider
+
+
+MONGO_URI = os.getenv("TEST_MONGO_URI")
+TEST_DB = "qwermap_test"
+
+@pytest.fixture(scope="session")
+def mongo_db():
+    """A scratch database with the models' indexes, dropped afterwards.
+
+    Tests that need it are skipped unless TEST_MONGO_URI names a mongod.
+    """
+    if not MONGO_URI:
+        pytest.skip("TEST_MONGO_URI not set")
+    connection = connect(db=TEST_DB, host=MONGO_URI, uuidRepresentation="standard")
+    connection.drop_database(TEST_DB)
+    for document in (Place, AnchorOutbox, SafetyCell):
+        document._collection = None
+        document.ensure_indexes()
+    yield connection[TEST_DB]
+    connection.drop_database(TEST_DB)
+    disconnect()
+
+
+@pytest.fixture
+def places(mongo_db):
+    """The places collection, emptied after each test."""
+    yield mongo_db.places
+    mongo_db.places.delete_many({})
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """An in-memory Redis behind get_redis, with the Lua scripts registered.
+
+    Tests that need it are skipped unless fakeredis (with lupa, for Lua)
+    is installed.
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(rate_limit, "_redis_client", client)
+    monkeypatch.setattr(
+        rate_limit, "_redis_binary_client", fakeredis.FakeRedis(server=server)
+    )
+    monkeypatch.setattr(
+        rate_limit,
+        "_write_slot_script",
+        client.register_script(rate_limit._WRITE_SLOT_LUA),
+    )
+    monkeypatch.setattr(rate_limit, "_local_limited", OrderedDict())
+    yield client
+
+
+@pytest.fixture
+def client(places, redis_client):
+    """Test client for the API routes on the scratch database and fake Redis."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.from_object(Config)
+    app.config.update(TESTING=True, SPATIAL_SNAPSHOT_ENABLED=False)
+    for bp in (places_bp, interactions_bp, safety_bp, moderation_bp):
+        app.register_blueprint(bp, url_prefix="/v1")
+    return app.test_client()
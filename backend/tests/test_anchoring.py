@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from services import anchoring
+
+
+class StubSolana:
+    def __init__(self, signature="sig-1", error=None):
+        self.signature = signature
+        self.error = error
+        self.memos = []
+
+    def send_memo(self, memo):
+        self.memos.append(memo)
+        if self.error:
+            raise self.error
+        return self.signature
+
+
+@pytest.fixture
+def outbox(mongo_db, monkeypatch):
+    monkeypatch.setattr(anchoring, "bump_places_version", lambda: None)
+    yield mongo_db.anchor_outbox
+    mongo_db.anchor_outbox.delete_many({})
+    mongo_db.places.delete_many({})
+
+
+def submitted_place(mongo_db, outbox_id, created_at=None):
+    place_id = ObjectId()
+    mongo_db.places.insert_one(
+        {
+            "_id": place_id,
+            "name": "Place",
+            "location": {"type": "Point", "coordinates": [-118.38, 34.09]},
+            "place_type": "current",
+            "category": "bar",
+            "transaction_id": anchoring.provisional_transaction_id(outbox_id),
+            "status": "approved",
+            "anchoring_status": "pending",
+            "on_chain_data": {"raw_data": {"memo": "memo-hash", "signature": None}},
+            "created_at": created_at or datetime.now(timezone.utc),
+        }
+    )
+    return place_id
+
+
+def test_claims_oldest_entry_once_per_lease(outbox):
+    first = anchoring.enqueue_memo("submit", ObjectId(), "a")
+    second = anchoring.enqueue_memo("upvote", ObjectId(), "b")
+
+    claimed = anchoring.claim_next_entry(lease_sec=60)
+    assert claimed["_id"] == first.id
+    assert claimed["attempts"] == 1
+    assert anchoring.claim_next_entry(lease_sec=60)["_id"] == second.id
+    assert anchoring.claim_next_entry(lease_sec=60) is None
+
+
+def test_successful_send_records_signature_on_place(mongo_db, outbox):
+    outbox_id = ObjectId()
+    place_id = submitted_place(mongo_db, outbox_id)
+    anchoring.enqueue_memo("submit", place_id, "memo-hash", outbox_id=outbox_id)
+
+    entry = anchoring.claim_next_entry(lease_sec=60)
+    assert anchoring.anchor_entry(entry, StubSolana("sig-1"), 3, 5)
+
+    place = mongo_db.places.find_one({"_id": place_id})
+    assert place["transaction_id"] == "sig-1"
+    assert place["anchoring_status"] == "anchored"
+    assert place["indexed_at"]  # moves the detail ETag
+    raw_data = place["on_chain_data"]["raw_data"]
+    assert raw_data == {"memo": "memo-hash", "signature": "sig-1"}
+    sent = outbox.find_one({"_id": outbox_id})
+    assert sent["status"] == "sent"
+    assert sent["signature"] == "sig-1"
+
+
+def test_failed_send_backs_off_then_fails_the_place(mongo_db, outbox):
+    outbox_id = ObjectId()
+    place_id = submitted_place(mongo_db, outbox_id)
+    anchoring.enqueue_memo("submit", place_id, "memo-hash", outbox_id=outbox_id)
+    solana = StubSolana(error=RuntimeError("rpc down"))
+
+    entry = anchoring.claim_next_entry(lease_sec=60)
+    assert not anchoring.anchor_entry(entry, solana, 2, 5)
+    retried = outbox.find_one({"_id": outbox_id})
+    assert retried["status"] == "pending"
+    assert retried["last_error"] == "rpc down"
+    assert anchoring.claim_next_entry(lease_sec=60) is None
+
+    outbox.update_one({"_id": outbox_id}, {"$set": {"locked_until": None}})
+    entry = anchoring.claim_next_entry(lease_sec=60)
+    assert entry["attempts"] == 2
+    assert not anchoring.anchor_entry(entry, solana, 2, 5)
+    assert outbox.find_one({"_id": outbox_id})["status"] == "failed"
+    place = mongo_db.places.find_one({"_id": place_id})
+    assert place["anchoring_status"] == "failed"
+    assert place["indexed_at"]
+
+
+def test_sweep_requeues_submissions_missing_their_entry(mongo_db, outbox):
+    old = datetime.now(timezone.utc) - timedelta(minutes=5)
+    lost_id, queued_id = ObjectId(), ObjectId()
+    lost_place = submitted_place(mongo_db, lost_id, created_at=old)
+    queued_place = submitted_place(mongo_db, queued_id, created_at=old)
+    anchoring.enqueue_memo("submit", queued_place, "memo-hash", outbox_id=queued_id)
+    submitted_place(mongo_db, ObjectId())  # too recent to count as lost
+
+    assert anchoring.requeue_unqueued_submissions(grace_sec=60) == 1
+    entry = outbox.find_one({"_id": lost_id})
+    assert entry["place_id"] == lost_place
+    assert entry["memo"] == "memo-hash"
+    assert entry["status"] == "pending"
+    assert anchoring.requeue_unqueued_submissions(grace_sec=60) == 0
+
+
+def test_sweep_requeues_parked_upvotes(mongo_db, outbox, redis_client):
+    outbox_id, place_id = ObjectId(), ObjectId()
+    anchoring.park_unqueued_upvote(outbox_id, place_id, "vote-hash")
+
+    assert anchoring.requeue_unqueued_upvotes() == 1
+    entry = outbox.find_one({"_id": outbox_id})
+    assert entry["kind"] == "upvote"
+    assert entry["place_id"] == place_id
+    assert entry["memo"] == "vote-hash"
+    assert redis_client.llen(anchoring.UNQUEUED_UPVOTES_KEY) == 0
+    assert anchoring.requeue_unqueued_upvotes() == 0
@@ -0,0 +1,35 @@
+from utils.bbox import parse_bbox, bbox_polygons, MAX_LAT
+
+
+def test_parse_bbox_ok():
+    bbox, msg = parse_bbox({"west": "-118.5", "south": "33.9", "east": "-118.1", "north": "34.2"})
+    assert msg is None
+    assert bbox == (-118.5, 33.9, -118.1, 34.2)
+
+
+def test_parse_bbox_rejects_bad_input():
+    assert parse_bbox({"west": "-118.5"})[1]
+    assert parse_bbox({"west": "0", "south": "10", "east": "1", "north": "5"})[1]
+    assert parse_bbox({"west": "0", "south": "0", "east": "200", "north": "5"})[1]
+
+
+def test_small_bbox_is_one_closed_polygon():
+    polygons = bbox_polygons(-118.5, 33.9, -118.1, 34.2)
+    assert len(polygons) == 1
+    ring = polygons[0]["coordinates"][0]
+    assert ring[0] == ring[-1]
+    assert {tuple(p) for p in ring} >= {(-118.5, 33.9), (-118.1, 34.2)}
+
+
+def test_antimeridian_bbox_wraps_longitudes():
+    polygons = bbox_polygons(170, -20, -170, -10)
+    ring = polygons[0]["coordinates"][0]
+    assert all(-180 <= lon <= 180 for lon, _ in ring)
+    assert {round(lon) for lon, _ in ring} >= {170, 180, -179, -170}
+
+
+def test_world_bbox_is_split_and_clamped():
+    polygons = bbox_polygons(-180, -90, 180, 90)
+    assert len(polygons) == 4
+    lats = {lat for p in polygons for _, lat in p["coordinates"][0]}
+    assert lats == {-MAX_LAT, MAX_LAT}
@@ -0,0 +1,53 @@
+from utils.cluster_grid import ClusterGrid
+
+
+LA = (-118.2437, 34.0522)
+WEHO = (-118.3617, 34.0900)
+NYC = (-74.0060, 40.7128)
+WORLD = (-180, -85, 180, 85)
+
+
+def make_grid():
+    grid = ClusterGrid()
+    grid.upsert("la", *LA, weight=5)
+    grid.upsert("weho", *WEHO, weight=9)
+    grid.upsert("nyc", *NYC, weight=1)
+    return grid
+
+
+def test_low_zoom_merges_nearby_points():
+    clusters, truncated = make_grid().clusters(3, *WORLD, limit=100)
+    assert not truncated
+    counts = sorted(c["count"] for c in clusters)
+    assert counts == [1, 2]
+    la = next(c for c in clusters if c["count"] == 2)
+    assert la["place_ids"] == ["weho", "la"]
+    assert la["lon"] == (LA[0] + WEHO[0]) / 2
+
+
+def test_high_zoom_splits_points():
+    clusters, _ = make_grid().clusters(14, *WORLD, limit=100)
+    assert len(clusters) == 3
+
+
+def test_bbox_filters_cells():
+    clusters, _ = make_grid().clusters(10, -119, 33, -118, 35, limit=100)
+    ids = {pid for c in clusters for pid in c["place_ids"]}
+    assert ids == {"la", "weho"}
+
+
+def test_remove_and_move_are_incremental():
+    grid = make_grid()
+    assert grid.remove("weho")
+    assert not grid.remove("weho")
+    grid.upsert("la", *NYC)
+    clusters, _ = grid.clusters(0, *WORLD, limit=100)
+    assert clusters[0]["count"] == 2
+    assert clusters[0]["lon"] == NYC[0]
+    assert len(grid) == 2
+
+
+def test_limit_keeps_biggest_clusters():
+    clusters, truncated = make_grid().clusters(3, *WORLD, limit=1)
+    assert truncated
+    assert clusters[0]["count"] == 2
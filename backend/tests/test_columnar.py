@@ -0,0 +1,45 @@
+import base64
+import struct
+
+from bson import ObjectId
+
+from utils.columnar import CATEGORY_CODES, pack_float32, packed_points, place_columns
+
+
+def test_place_columns():
+    oid = ObjectId()
+    columns = place_columns(
+        [
+            {
+                "_id": oid,
+                "location": {"type": "Point", "coordinates": [-74.0, 40.7]},
+                "safety_score": 12.5,
+                "category": "cafe",
+            },
+            {
+                "_id": "x",
+                "location": {"type": "Point", "coordinates": [1.0, 2.0]},
+                "category": "unknown",
+            },
+        ]
+    )
+    assert columns["ids"] == [str(oid), "x"]
+    assert columns["lons"] == [-74.0, 1.0]
+    assert columns["lats"] == [40.7, 2.0]
+    assert columns["scores"] == [12.5, 0]
+    assert columns["categories"] == [CATEGORY_CODES.index("cafe"), -1]
+    assert columns["category_codes"] == list(CATEGORY_CODES)
+
+
+def test_pack_float32_is_little_endian():
+    assert pack_float32([[1.0, -2.5], [0.5]]) == struct.pack("<3f", 1.0, -2.5, 0.5)
+
+
+def test_packed_points_base64_for_json():
+    payload = packed_points([[1.0, 2.0, 3.0]], 3, "columnar")
+    assert payload["count"] == 1
+    assert payload["stride"] == 3
+    assert base64.b64decode(payload["points"]) == struct.pack("<3f", 1.0, 2.0, 3.0)
+    assert packed_points([[1.0, 2.0, 3.0]], 3, "msgpack")["points"] == struct.pack(
+        "<3f", 1.0, 2.0, 3.0
+    )
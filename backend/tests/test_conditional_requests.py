@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+
+LAT, LON = 34.0901, -118.3617
+
+
+@pytest.fixture
+def place_id(mongo_db, places):
+    yield places.insert_one(
+        {
+            "name": "Place",
+            "location": {"type": "Point", "coordinates": [LON, LAT]},
+            "place_type": "current",
+            "category": "bar",
+            "transaction_id": str(ObjectId()),
+            "status": "approved",
+            "upvote_count": 0,
+            "created_at": datetime.now(timezone.utc),
+            "indexed_at": datetime.now(timezone.utc),
+        }
+    ).inserted_id
+    # Upvotes also queue a memo and touch the safety grid.
+    mongo_db.anchor_outbox.delete_many({})
+    mongo_db.safety_cells.delete_many({})
+
+
+def upvote(client, place_id):
+    response = client.post(
+        f"/v1/places/{place_id}/upvote",
+        headers={"X-Client-Fingerprint": str(ObjectId())},
+    )
+    assert response.status_code == 200
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": f'"{etag}"'})
+
+
+@pytest.mark.parametrize("url", ["/v1/places?lat={lat}&lon={lon}", "/v1/places/{id}"])
+def test_matching_etag_is_not_modified_until_a_write(client, place_id, url):
+    url = url.format(lat=LAT, lon=LON, id=place_id)
+    first = client.get(url)
+    assert first.status_code == 200
+    etag, _ = first.get_etag()
+    assert etag
+
+    cached = revalidate(client, url, etag)
+    assert cached.status_code == 304
+    assert cached.get_etag()[0] == etag
+    assert not cached.data
+
+    upvote(client, place_id)
+    changed = revalidate(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.get_etag()[0] != etag
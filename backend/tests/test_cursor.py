@@ -0,0 +1,17 @@
+import pytest
+
+from utils.cursor import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    values = {"d": 1523.0871234, "id": "65f1c0ffee0000000000beef"}
+    token = encode_cursor(values)
+    assert "=" not in token
+    assert decode_cursor(token) == values
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor!")
+    with pytest.raises(ValueError):
+        decode_cursor("WzEsMl0")  # base64 of "[1,2]", valid JSON but not an object
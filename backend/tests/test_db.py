@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import db
+from models import Place
+
+
+def test_stale_2dsphere_indexes_are_dropped(monkeypatch):
+    indexes = {
+        "_id_": {"key": [("_id", 1)]},
+        "location_2dsphere": {"key": [("location", "2dsphere")]},
+        "location_2dsphere_status_1_place_type_1_category_1": {
+            "key": [
+                ("location", "2dsphere"),
+                ("status", 1),
+                ("place_type", 1),
+                ("category", 1),
+            ]
+        },
+        "old_status_1": {"key": [("status", 1)]},
+    }
+    dropped = []
+    collection = SimpleNamespace(
+        index_information=lambda: indexes, drop_index=dropped.append
+    )
+    monkeypatch.setattr(Place, "_get_db", classmethod(lambda cls: {"places": collection}))
+    db.drop_stale_geo_indexes(Place)
+    assert dropped == ["location_2dsphere"]
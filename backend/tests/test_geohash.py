@@ -0,0 +1,39 @@
+from utils.geohash import encode, decode, bounds, cell_size, covering
+
+
+def test_encode_known_value():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_decode_returns_cell_center():
+    south, west, north, east = bounds("9q5cfj")
+    lat, lon = decode("9q5cfj")
+    assert south <= 34.0878 <= north
+    assert west <= -118.3802 <= east
+    assert lat == (south + north) / 2
+    assert lon == (west + east) / 2
+
+
+def test_nearby_points_share_a_cell():
+    assert encode(34.08781, -118.38021, 6) == encode(34.08779, -118.38019, 6)
+
+
+def test_cell_size_halves_alternately():
+    assert cell_size(1) == (45.0, 45.0)
+    assert cell_size(2) == (5.625, 11.25)
+
+
+def test_covering_includes_every_touched_cell():
+    cells = covering(34.0, -118.5, 34.2, -118.2, 5)
+    lat_step, lon_step = cell_size(5)
+    assert len(set(cells)) == len(cells)
+    for lat in (34.0, 34.1, 34.2):
+        for lon in (-118.5, -118.35, -118.2):
+            assert encode(lat, lon, 5) in cells
+    assert all(len(cell) == 5 for cell in cells)
+
+
+def test_covering_wraps_the_antimeridian():
+    cells = covering(-1.0, 179.0, 1.0, -179.0, 3)
+    assert encode(0.0, 179.5, 3) in cells
+    assert encode(0.0, -179.5, 3) in cells
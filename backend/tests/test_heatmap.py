@@ -0,0 +1,32 @@
+from utils.heatmap import bin_points, cell_count, in_tile
+from utils.tiles import lonlat_to_world
+
+
+def test_points_in_one_cell_are_summed():
+    points = [[-118.3601, 34.0901, 10.0], [-118.3602, 34.0902, 20.0]]
+    [(lon, lat, score, count)] = bin_points(points, 10, 32)
+    assert (score, count) == (30.0, 2)
+    assert abs(lon + 118.36) < 0.2 and abs(lat - 34.09) < 0.2
+
+
+def test_far_apart_points_stay_separate():
+    points = [[-118.36, 34.09, 10.0], [-73.99, 40.73, 5.0]]
+    assert len(bin_points(points, 10, 32)) == 2
+
+
+def test_cell_count_matches_viewport_size():
+    # One z1 tile is 256px wide, so 8 columns and 8 rows of 32px cells.
+    assert cell_count(-179.9, 0.1, -0.1, 85.0, 1, 32) == 64
+
+
+def test_cell_count_wraps_the_antimeridian():
+    assert cell_count(170.0, -5.0, -170.0, 5.0, 3, 256) == cell_count(
+        -10.0, -5.0, 10.0, 5.0, 3, 256
+    )
+
+
+def test_in_tile():
+    wx, wy = lonlat_to_world(-118.36, 34.09)
+    x, y = int(wx * 4096), int(wy * 4096)
+    assert in_tile(-118.36, 34.09, 12, x, y)
+    assert not in_tile(-118.36, 34.09, 12, x + 1, y)
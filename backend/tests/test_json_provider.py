@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+import utils.json_provider as json_provider
+from utils.json_provider import FastJSONProvider
+
+
+OID = ObjectId("65f1c0ffee0000000000beef")
+WHEN = datetime(2024, 6, 28, 1, 20, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def app(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def test_dumps_datetime_and_object_id(app):
+    body = app.json.dumps({"id": OID, "created_at": WHEN, "missing": None})
+    assert app.json.loads(body) == {
+        "id": "65f1c0ffee0000000000beef",
+        "created_at": "2024-06-28T01:20:00+00:00",
+        "missing": None,
+    }
+
+
+def test_jsonify_response(app):
+    with app.app_context():
+        response = app.json.response({"id": OID})
+    assert response.mimetype == "application/json"
+    assert response.get_json() == {"id": "65f1c0ffee0000000000beef"}
@@ -0,0 +1,34 @@
+import pytest
+
+from utils.merkle import leaf_hash, merkle_tree, root_from_proof
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8])
+def test_every_proof_leads_to_root(count):
+    items = [f"memo-{i}" for i in range(count)]
+    root, proofs = merkle_tree(items)
+    for item, proof in zip(items, proofs):
+        assert root_from_proof(item, proof) == root
+
+
+def test_single_item_root_is_its_leaf():
+    root, proofs = merkle_tree(["only"])
+    assert root == leaf_hash("only")
+    assert proofs == [[]]
+
+
+def test_tampered_item_or_proof_fails():
+    items = ["a", "b", "c"]
+    root, proofs = merkle_tree(items)
+    assert root_from_proof("x", proofs[0]) != root
+    bad = [dict(proofs[0][0], side="left")] + proofs[0][1:]
+    assert root_from_proof("a", bad) != root
+
+
+def test_malformed_proof_raises():
+    with pytest.raises(ValueError):
+        root_from_proof("a", [{"side": "up", "hash": "00"}])
+    with pytest.raises(ValueError):
+        root_from_proof("a", [{"hash": "00"}])
+    with pytest.raises(ValueError):
+        merkle_tree([])
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+
+def pending_place(created_at=None):
+    place = {
+        "_id": ObjectId(),
+        "name": "Place",
+        "location": {"type": "Point", "coordinates": [-118.38, 34.09]},
+        "place_type": "current",
+        "category": "bar",
+        "transaction_id": str(ObjectId()),
+        "status": "pending",
+    }
+    if created_at:
+        place["created_at"] = created_at
+    return place
+
+
+def test_queue_pages_through_rows_without_created_at(client, places):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    dated = [pending_place(now - timedelta(minutes=i)) for i in range(2)]
+    legacy = [pending_place() for _ in range(3)]
+    places.insert_many(dated + legacy)
+
+    seen, cursor = [], None
+    while True:
+        url = "/v1/moderation/queue?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.extend(item["id"] for item in body["places"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    legacy_ids = sorted((str(p["_id"]) for p in legacy), reverse=True)
+    assert seen == [str(p["_id"]) for p in dated] + legacy_ids
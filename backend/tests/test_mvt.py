@@ -0,0 +1,77 @@
+import struct
+
+from utils.mvt import encode_point_layer
+
+
+def read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def read_fields(buf):
+    pos = 0
+    fields = []
+    while pos < len(buf):
+        key, pos = read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        else:
+            length, pos = read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        fields.append((field, value))
+    return fields
+
+
+def read_packed(buf):
+    values, pos = [], 0
+    while pos < len(buf):
+        value, pos = read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def test_empty_layer_is_empty_tile():
+    assert encode_point_layer("places", []) == b""
+
+
+def test_point_layer_round_trip():
+    tile = encode_point_layer(
+        "places",
+        [
+            (10, 20, {"name": "Stonewall Inn", "safety_score": 42.5, "upvotes": 3}),
+            (-5, 4100, {"name": "Stonewall Inn", "era": None}),
+        ],
+    )
+    [(field, layer)] = read_fields(tile)
+    assert field == 3
+    layer = read_fields(layer)
+    by_field = {}
+    for field, value in layer:
+        by_field.setdefault(field, []).append(value)
+
+    assert by_field[15] == [2]
+    assert by_field[1] == [b"places"]
+    assert by_field[5] == [4096]
+    assert by_field[3] == [b"name", b"safety_score", b"upvotes"]
+    assert len(by_field[4]) == 3  # "Stonewall Inn" is shared
+
+    first, second = (dict(read_fields(f)) for f in by_field[2])
+    assert read_packed(first[2]) == [0, 0, 1, 1, 2, 2]
+    assert first[3] == 1
+    assert read_packed(first[4]) == [9, 20, 40]
+    assert read_packed(second[2]) == [0, 0]
+    assert read_packed(second[4]) == [9, 9, 8200]
+
+    values = [dict(read_fields(v)) for v in by_field[4]]
+    assert values[0] == {1: b"Stonewall Inn"}
+    assert struct.unpack("<d", values[1][3]) == (42.5,)
+    assert values[2] == {6: 6}
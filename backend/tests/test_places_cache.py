@@ -0,0 +1,69 @@
+import random
+
+import bson
+import pytest
+from flask import Flask
+
+from routes.places import _cached_candidates
+from services.cache import (
+    MAX_REACH_FRACTION,
+    RADIUS_BUCKETS,
+    get_cache_stats,
+    places_cache_key,
+    quantize_viewport,
+)
+from utils.safety_grid import _distance
+
+
+@pytest.mark.parametrize("precision", [4, 5, 6])
+@pytest.mark.parametrize("lat", [0.0, 34.05, 64.8])
+def test_snapped_circle_contains_the_requested_one(precision, lat):
+    rng = random.Random(precision)
+    for _ in range(200):
+        point_lat = lat + rng.uniform(-0.2, 0.2)
+        point_lon = -118.24 + rng.uniform(-0.2, 0.2)
+        radius = rng.choice([100, 501, 5000, 50001])
+        center_lat, center_lon, cover, _ = quantize_viewport(
+            point_lat, point_lon, radius, precision
+        )
+        offset = _distance(point_lat, point_lon, center_lat, center_lon)
+        assert offset + radius <= cover
+
+
+def test_points_in_one_cell_share_center_and_radius():
+    first = quantize_viewport(34.05201, -118.24371, 5000, 6)
+    second = quantize_viewport(34.05199, -118.24369, 5000, 6)
+    assert first == second
+    assert len(first[3]) == 6
+
+
+@pytest.mark.parametrize("radius", [50000, 100000, 250000, 500000])
+def test_wide_radius_keeps_its_bucket(radius):
+    # 50000 is the default; it used to be widened into the 100000 bucket.
+    assert radius in RADIUS_BUCKETS
+    _, _, cover, cell = quantize_viewport(34.05, -118.24, radius, 6)
+    assert radius < cover <= radius * (1 + MAX_REACH_FRACTION)
+    assert len(cell) < 6  # wide viewports share coarser cells
+
+
+def test_too_dense_marker_counts_as_a_bypass(redis_client):
+    app = Flask(__name__)
+    app.config.update(
+        PLACES_CACHE_TTL_SEC=30,
+        PLACES_CACHE_GEOHASH_PRECISION=6,
+        PLACES_CACHE_MAX_ROWS=2000,
+    )
+    filters = (None, None, "approved")
+    _, _, cover, cell = quantize_viewport(34.05, -118.24, 5000, 6)
+    key = places_cache_key(
+        1, cell, cover, {"type": None, "category": None, "status": "approved"}
+    )
+    redis_client.set(key, bson.encode({"places": None}))
+
+    with app.app_context():
+        rows, status = _cached_candidates(1, 34.05, -118.24, 5000, {}, filters)
+        assert (rows, status) == (None, "BYPASS")
+        stats = get_cache_stats()
+    assert stats["bypasses"] == 1
+    assert stats["hits"] == 0
+    assert stats["hit_ratio"] == 0
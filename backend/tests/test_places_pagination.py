@@ -0,0 +1,83 @@
+from bson import ObjectId
+
+from routes.places import _nearby_from_mongo, settle_boundary_ties
+
+
+LAT, LON = 34.0522, -118.2437
+
+
+def place(lon, lat):
+    return {
+        "_id": ObjectId(),
+        "name": "Place",
+        "location": {"type": "Point", "coordinates": [lon, lat]},
+        "place_type": "current",
+        "category": "bar",
+        "transaction_id": str(ObjectId()),
+        "status": "approved",
+    }
+
+
+def test_cursor_pages_split_ties_without_repeats(places):
+    # Five places share one distance; insert them out of _id order.
+    tied = [place(LON, LAT + 0.01) for _ in range(5)]
+    places.insert_many(list(reversed(tied)) + [place(LON, LAT + 0.02)])
+
+    seen, after = [], None
+    while True:
+        page, total = _nearby_from_mongo(
+            LAT, LON, 10000, {}, 2, 0, after, "exact", None
+        )
+        if not page:
+            break
+        seen.extend(row["_id"] for row in page)
+        assert total == 6 - len(seen) + len(page)
+        after = (page[-1]["distance_meters"], page[-1]["_id"])
+
+    assert seen == sorted(p["_id"] for p in tied) + [seen[-1]]
+    assert len(set(seen)) == 6
+
+
+def test_offset_pages_keep_full_total(places):
+    places.insert_many([place(LON, LAT + 0.01) for _ in range(4)])
+    first, total = _nearby_from_mongo(LAT, LON, 10000, {}, 2, 0, None, "exact", None)
+    second, second_total = _nearby_from_mongo(
+        LAT, LON, 10000, {}, 2, 2, None, "exact", None
+    )
+    assert total == second_total == 4
+    for page in (first, second):
+        assert [r["_id"] for r in page] == sorted(r["_id"] for r in page)
+
+
+def row(distance):
+    return {"_id": ObjectId(), "distance_meters": distance}
+
+
+def test_settle_keeps_geo_near_order_without_boundary_tie():
+    rows = [row(1.0), row(2.0), row(3.0)]
+
+    def fetch_ties(distance):
+        raise AssertionError("no tie at the boundary")
+
+    assert settle_boundary_ties(rows, 2, fetch_ties) == rows[:2]
+
+
+def test_settle_fetches_every_tie_at_the_boundary():
+    near = row(1.0)
+    tied = sorted((row(2.0) for _ in range(4)), key=lambda r: r["_id"])
+    # $geoNear returned two of the four ties, neither the lowest _id.
+    rows = [near, tied[3], tied[2]]
+    fetched = []
+
+    def fetch_ties(distance):
+        fetched.append(distance)
+        return list(reversed(tied))
+
+    assert settle_boundary_ties(rows, 2, fetch_ties) == [near, tied[0]]
+    assert fetched == [2.0]
+
+
+def test_settle_sorts_a_short_last_page():
+    tied = [row(2.0) for _ in range(3)]
+    page = settle_boundary_ties(list(reversed(tied)), 5)
+    assert [r["_id"] for r in page] == sorted(r["_id"] for r in tied)
@@ -0,0 +1,252 @@
+"""Every route's query shape must be answered from an index.
+
+Runs explain() against a local mongod and fails on a COLLSCAN or an
+in-memory SORT in the winning plan. Point TEST_MONGO_URI at a scratch
+server to run it; tests/conftest.py creates and drops a scratch database:
+
+    TEST_MONGO_URI=mongodb://localhost:27017 python -m pytest tests/test_query_indexes.py
+
+When a route gains a query or changes one, add its shape here.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from routes.places import (
+    candidates_pipeline,
+    nearby_pipeline,
+    place_filter_query,
+    ties_pipeline,
+)
+from services.anchoring import _claimable
+from utils.bbox import EARTH_RADIUS_METERS, bbox_polygons
+
+
+LAT, LON = 34.0878, -118.3802
+BBOX = (-118.5, 33.9, -118.2, 34.2)
+BLOCKED_STAGES = {"COLLSCAN", "SORT"}
+
+
+@pytest.fixture(scope="module")
+def db(mongo_db):
+    now = datetime.now(timezone.utc)
+    mongo_db.places.insert_many(
+        [
+            {
+                "name": f"Place {i}",
+                "location": {
+                    "type": "Point",
+                    "coordinates": [LON + i * 0.001, LAT + i * 0.001],
+                },
+                "place_type": ("current", "historical")[i % 2],
+                "category": ("bar", "cafe", "park")[i % 3],
+                "transaction_id": f"tx-{i}",
+                "status": ("pending", "approved", "rejected")[i % 3],
+                "upvote_count": i,
+                "created_at": now,
+            }
+            for i in range(60)
+        ]
+    )
+    yield mongo_db
+    mongo_db.places.delete_many({})
+
+
+def _winning_stages(node, found):
+    """Collect plan stage names under every winningPlan in an explain result."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                _plan_stages(value, found)
+            elif key in ("rejectedPlans", "command"):
+                continue
+            else:
+                _winning_stages(value, found)
+        # Pipeline stages the query layer couldn't absorb, e.g. a $sort.
+        if "$sort" in node:
+            found.append("SORT")
+    elif isinstance(node, list):
+        for item in node:
+            _winning_stages(item, found)
+    return found
+
+
+def _plan_stages(node, found):
+    if isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            found.append(node["stage"])
+        for value in node.values():
+            _plan_stages(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _plan_stages(item, found)
+
+
+def _assert_indexed(explain):
+    stages = _winning_stages(explain, [])
+    assert stages, explain
+    assert not BLOCKED_STAGES & set(stages), stages
+
+
+def _explain_aggregate(db, collection, pipeline):
+    return db.command("aggregate", collection, pipeline=pipeline, explain=True)
+
+
+def _within_bbox(query):
+    polygons = [
+        {"location": {"$geoWithin": {"$geometry": p}}} for p in bbox_polygons(*BBOX)
+    ]
+    return {**query, "$or": polygons}
+
+
+# (place_type, category, status) as GET /places receives them.
+FILTERS = [
+    (None, None, None),
+    (None, None, "approved"),
+    ("historical", None, None),
+    (None, "bar", "approved"),
+    ("current", "cafe", "approved"),
+]
+
+
+@pytest.mark.parametrize("total_mode", ["exact", "estimate", "none"])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_nearby_places_geo_near(db, filters, total_mode):
+    # GET /places, /safety-scores?mode=exact, /safety-scores/heatmap
+    query = place_filter_query(*filters)
+    pipeline = nearby_pipeline(LAT, LON, 5000, query, 20, 0, None, total_mode, None)
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+def test_nearby_places_keyset_page(db):
+    # GET /places?cursor=...
+    query = place_filter_query(None, None, "approved")
+    after = (100.0, ObjectId())
+    pipeline = nearby_pipeline(LAT, LON, 5000, query, 20, 0, after, "none", None)
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+def test_nearby_places_boundary_ties(db):
+    # GET /places when a page ends inside a run of equidistant places
+    query = place_filter_query(None, None, "approved")
+    pipeline = ties_pipeline(LAT, LON, 100.0, query, (100.0, ObjectId()), None)
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_viewport_cache_candidates(db, filters):
+    # GET /places on a viewport cache miss
+    pipeline = candidates_pipeline(LAT, LON, 10000, place_filter_query(*filters), 2000)
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_places_in_bbox(db, filters):
+    # GET /places/bbox, /tiles/{z}/{x}/{y}.mvt, heatmap bbox and tile endpoints
+    query = place_filter_query(*filters)
+    pipeline = [{"$match": _within_bbox(query)}, {"$limit": 501}]
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+def test_batch_safety_scores(db):
+    # POST /safety-scores/batch
+    spheres = [
+        {
+            "location": {
+                "$geoWithin": {
+                    "$centerSphere": [[LON + i * 0.01, LAT], 1000 / EARTH_RADIUS_METERS]
+                }
+            }
+        }
+        for i in range(3)
+    ]
+    pipeline = [
+        {"$match": {"status": "approved", "$or": spheres}},
+        {"$project": {"location": 1, "upvote_count": 1}},
+    ]
+    _assert_indexed(_explain_aggregate(db, "places", pipeline))
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"status": "pending"},
+        {"status": "pending", "category": "bar", "place_type": "current"},
+        {
+            "status": "pending",
+            "$or": [
+                {"created_at": {"$lt": datetime(2030, 1, 1)}},
+                {"created_at": datetime(2030, 1, 1), "_id": {"$lt": ObjectId()}},
+                {"created_at": None},
+            ],
+        },
+        {"status": "pending", "created_at": None, "_id": {"$lt": ObjectId()}},
+    ],
+)
+def test_moderation_queue(db, query):
+    # GET /moderation/queue
+    cursor = (
+        db.places.find(query, {"name": 1, "created_at": 1})
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(20)
+    )
+    _assert_indexed(cursor.explain())
+
+
+def test_moderation_pending_count(db):
+    # services.moderation recount when the pending counter has expired
+    _assert_indexed(
+        db.command("explain", {"count": "places", "query": {"status": "pending"}})
+    )
+
+
+def test_approved_places_for_clusters(db):
+    # services.clusters, behind GET /places/clusters
+    cursor = db.places.find({"status": "approved"}, {"location": 1, "upvote_count": 1})
+    _assert_indexed(cursor.explain())
+
+
+def test_unqueued_submission_sweep(db):
+    # services.anchoring.requeue_unqueued_submissions, run by the worker
+    cursor = db.places.find(
+        {"anchoring_status": "pending", "created_at": {"$lte": datetime(2030, 1, 1)}},
+        {"transaction_id": 1},
+    )
+    _assert_indexed(cursor.explain())
+
+
+@pytest.mark.parametrize(
+    "query",
+    [{"_id": ObjectId()}, {"transaction_id": "tx-1"}],
+)
+def test_place_lookup(db, query):
+    # GET /places/{id}, POST /places/{id}/upvote, PATCH /moderation/places/{id}
+    _assert_indexed(db.places.find(query).limit(1).explain())
+
+
+def test_safety_grid_cells(db):
+    # GET /safety-scores?mode=grid
+    cursor = db.safety_cells.find({"_id": {"$in": ["approved:9q5c", "pending:9q5c"]}})
+    _assert_indexed(cursor.explain())
+
+
+@pytest.mark.parametrize(
+    "query",
+    [{"_id": ObjectId()}, {"merkle_root": "ab" * 32, "status": "sent"}],
+)
+def test_anchor_lookup(db, query):
+    # GET /anchors/{id}, POST /anchors/verify
+    _assert_indexed(db.anchor_outbox.find(query).limit(1).explain())
+
+
+@pytest.mark.parametrize("kinds", [("submit",), ("upvote",), ("submit", "upvote")])
+def test_outbox_claim(db, kinds):
+    # services.anchoring.claim_next_entry and claim_upvote_batch
+    cursor = (
+        db.anchor_outbox.find(_claimable(datetime.now(timezone.utc), kinds))
+        .sort("created_at", 1)
+        .limit(1)
+    )
+    _assert_indexed(cursor.explain())
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import rate_limit
+from services.rate_limit import (
+    DUPLICATE,
+    FIXED_WINDOW,
+    RATE_LIMITED,
+    SLIDING_WINDOW,
+    _limit_lifts_at,
+    acquire_write_slot,
+)
+
+
+def test_fixed_window_lifts_at_window_end():
+    assert _limit_lifts_at(130, 100, FIXED_WINDOW, 5, 5, 0) == 200
+
+
+def test_sliding_window_full_current_waits_for_window_end():
+    assert _limit_lifts_at(130, 100, SLIDING_WINDOW, 5, 7, 3) == 200
+
+
+def test_sliding_window_lifts_once_previous_weight_decays():
+    # 2 + 6 * (1 - elapsed / 100) < 5 once half the window has passed.
+    assert _limit_lifts_at(120, 100, SLIDING_WINDOW, 5, 2, 6) == 150
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def remote_decisions():
+    return rate_limit.get_rate_limit_stats()["remote"]
+
+
+def test_write_slots_run_out_at_the_limit(redis_client, clock):
+    for _ in range(3):
+        assert acquire_write_slot("k", 3, 100, strategy=FIXED_WINDOW) is None
+    assert acquire_write_slot("k", 3, 100, strategy=FIXED_WINDOW) == RATE_LIMITED
+    # Rejections don't use up slots.
+    assert redis_client.get("rate:k:10") == "3"
+
+
+def test_duplicates_are_rejected_without_using_a_slot(redis_client, clock):
+    assert acquire_write_slot("k", 3, 100, dedupe_key="vote:1") is None
+    assert acquire_write_slot("k", 3, 100, dedupe_key="vote:1") == DUPLICATE
+    assert redis_client.get("rate:k:10") == "1"
+
+
+@pytest.mark.parametrize("strategy, ttl", [(FIXED_WINDOW, 100), (SLIDING_WINDOW, 200)])
+def test_counters_and_dedupe_keys_expire(redis_client, clock, strategy, ttl):
+    acquire_write_slot(
+        "k", 3, 100, dedupe_key="vote:1", dedupe_ttl_sec=60, strategy=strategy
+    )
+    assert redis_client.ttl("rate:k:10") == ttl
+    assert redis_client.ttl("vote:1") == 60
+
+
+def test_limited_keys_are_turned_away_locally_until_the_limit_lifts(
+    redis_client, clock
+):
+    assert acquire_write_slot("k", 1, 100, strategy=FIXED_WINDOW) is None
+    assert acquire_write_slot("k", 1, 100, strategy=FIXED_WINDOW) == RATE_LIMITED
+    remote = remote_decisions()
+    clock[0] = 1099.0
+    assert acquire_write_slot("k", 1, 100, strategy=FIXED_WINDOW) == RATE_LIMITED
+    assert remote_decisions() == remote
+    clock[0] = 1100.0
+    assert acquire_write_slot("k", 1, 100, strategy=FIXED_WINDOW) is None
+    assert remote_decisions() == remote + 1
+
+
+def test_local_limited_keys_are_evicted_least_recently_used_first(
+    redis_client, clock, monkeypatch
+):
+    monkeypatch.setattr(rate_limit, "LOCAL_LIMITED_MAX_KEYS", 2)
+    for key in ("a", "b", "a", "c"):
+        assert acquire_write_slot(key, 0, 100) == RATE_LIMITED
+    # "a" was turned away locally after "b", so "b" is the one dropped.
+    assert list(rate_limit._local_limited) == ["a", "c"]
+
+
+def fill_window(key, limit, strategy):
+    for _ in range(limit):
+        assert acquire_write_slot(key, limit, 100, strategy=strategy) is None
+
+
+def test_fixed_window_allows_a_burst_across_the_boundary(redis_client, clock):
+    clock[0] = 1099.0
+    fill_window("k", 4, FIXED_WINDOW)
+    clock[0] = 1100.0
+    fill_window("k", 4, FIXED_WINDOW)
+
+
+def test_sliding_window_carries_the_previous_window_across_the_boundary(
+    redis_client, clock
+):
+    clock[0] = 1099.0
+    fill_window("k", 4, SLIDING_WINDOW)
+    clock[0] = 1100.0
+    assert acquire_write_slot("k", 4, 100) == RATE_LIMITED
+    # 0 + 4 * 1.0 is at the limit; any decay of the weight lifts it.
+    assert rate_limit._local_limited["k"] == 1100.0
+    clock[0] = 1101.0
+    assert acquire_write_slot("k", 4, 100) is None
+
+
+def test_sliding_window_retry_time_follows_the_decaying_weight(redis_client, clock):
+    clock[0] = 1099.0
+    fill_window("k", 4, SLIDING_WINDOW)
+    rate_limit._local_limited.clear()
+    clock[0] = 1120.0
+    # 0 + 4 * 0.8 leaves room for one; 1 + 4 * 0.8 is over.
+    assert acquire_write_slot("k", 4, 100) is None
+    assert acquire_write_slot("k", 4, 100) == RATE_LIMITED
+    # 1 + 4 * (1 - elapsed / 100) < 4 once elapsed passes 25.
+    assert rate_limit._local_limited["k"] == 1125.0
+
+    remote = remote_decisions()
+    clock[0] = 1124.0
+    assert acquire_write_slot("k", 4, 100) == RATE_LIMITED
+    assert remote_decisions() == remote
+    clock[0] = 1126.0
+    assert acquire_write_slot("k", 4, 100) is None
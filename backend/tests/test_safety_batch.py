@@ -0,0 +1,59 @@
+import math
+
+from bson import ObjectId
+
+from utils.bbox import EARTH_RADIUS_METERS
+
+
+LAT, LON = 34.0901, -118.3617
+RADIUS = 1000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def place_north(meters, upvotes, lat=LAT):
+    return {
+        "_id": ObjectId(),
+        "name": "Place",
+        "location": {
+            "type": "Point",
+            "coordinates": [LON, lat + meters / METERS_PER_DEGREE],
+        },
+        "place_type": "current",
+        "category": "bar",
+        "transaction_id": str(ObjectId()),
+        "status": "approved",
+        "upvote_count": upvotes,
+    }
+
+
+def test_batch_counts_match_exact_mode(client, places):
+    places.insert_many(
+        [
+            place_north(0, 1),
+            place_north(500, 2),
+            place_north(RADIUS - 5, 3),  # just inside the first circle
+            place_north(RADIUS + 5, 4),  # just outside it
+            place_north(1500, 5),
+        ]
+    )
+    points = [
+        {"lat": LAT, "lon": LON},
+        {"lat": LAT + 800 / METERS_PER_DEGREE, "lon": LON},
+        {"lat": LAT + 0.5, "lon": LON},  # nothing in range
+    ]
+
+    response = client.post(
+        "/v1/safety-scores/batch", json={"points": points, "radius": RADIUS}
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+
+    for point, result in zip(points, results):
+        exact = client.get(
+            "/v1/safety-scores",
+            query_string={**point, "radius": RADIUS, "mode": "exact"},
+        ).get_json()
+        for name in ("place_count", "total_upvotes", "safety_score"):
+            assert result[name] == exact[name], (point, name)
+    assert [r["place_count"] for r in results] == [3, 5, 0]
+    assert results[0]["total_upvotes"] == 6
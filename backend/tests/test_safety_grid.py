@@ -0,0 +1,38 @@
+from utils.geohash import decode
+from utils.safety_grid import (
+    GRID_PRECISIONS,
+    MAX_COVER_CELLS,
+    cells_in_radius,
+    grid_precision,
+    place_cells,
+)
+
+
+def test_place_cells_nest_from_coarse_to_fine():
+    cells = place_cells(34.0901, -118.3617)
+    assert [len(c) for c in cells] == list(GRID_PRECISIONS)
+    assert all(fine.startswith(coarse) for coarse, fine in zip(cells, cells[1:]))
+
+
+def test_small_radius_uses_finest_cells():
+    assert grid_precision(34.0, 500) == GRID_PRECISIONS[-1]
+
+
+def test_larger_radius_uses_coarser_cells_under_the_cap():
+    precision = grid_precision(34.0, 50000)
+    assert precision < GRID_PRECISIONS[-1]
+    assert len(cells_in_radius(34.0, -118.3, 50000, precision)) <= MAX_COVER_CELLS
+
+
+def test_cells_in_radius_contains_the_center_cell():
+    cells = cells_in_radius(34.0901, -118.3617, 2000, 6)
+    assert place_cells(34.0901, -118.3617)[2] in cells
+    lat, lon = decode(cells[0])
+    assert abs(lat - 34.0901) < 0.05 and abs(lon + 118.3617) < 0.05
+
+
+def test_radius_smaller_than_a_cell_still_covers_the_center_cell():
+    # ~150m cells at precision 7, queried off-center with a 10m radius.
+    assert cells_in_radius(34.0901, -118.3617, 10, 7) == [
+        place_cells(34.0901, -118.3617)[-1]
+    ]
@@ -0,0 +1,28 @@
+from services import safety_grid
+
+
+def applied(monkeypatch):
+    operations = []
+    monkeypatch.setattr(safety_grid, "_apply", operations.extend)
+    return operations
+
+
+def test_flushed_upvotes_take_one_update_per_cell_guarded_by_flush_id(monkeypatch):
+    operations = applied(monkeypatch)
+    point = (-118.3617, 34.0901)
+    safety_grid.record_upvotes(
+        [(point, "approved", 2), (point, "approved", 3)], flush_id="f1"
+    )
+    assert len(operations) == len(safety_grid.place_cells(point[1], point[0]))
+    for op in operations:
+        assert op._filter["upvote_flushes"] == {"$ne": "f1"}
+        assert op._doc["$inc"] == {"place_count": 0, "total_upvotes": 5}
+        assert op._doc["$push"]["upvote_flushes"]["$each"] == ["f1"]
+
+
+def test_upvotes_without_flush_id_are_unguarded(monkeypatch):
+    operations = applied(monkeypatch)
+    safety_grid.record_upvotes([((-118.3617, 34.0901), "approved", 1)])
+    assert operations
+    assert all("upvote_flushes" not in op._filter for op in operations)
+    assert all("$push" not in op._doc for op in operations)
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta, timezone
+
+from utils.score_decay import decay_factor, decayed_weight
+
+
+DAY = 86400
+
+
+def test_weight_halves_every_half_life():
+    assert decay_factor(30 * DAY, 30 * DAY) == 0.5
+    assert decay_factor(60 * DAY, 30 * DAY) == 0.25
+
+
+def test_no_decay_when_disabled_or_in_the_future():
+    assert decay_factor(10 * DAY, 0) == 1.0
+    assert decay_factor(-5, 30 * DAY) == 1.0
+
+
+def test_naive_timestamps_are_utc():
+    now = datetime(2025, 1, 31, tzinfo=timezone.utc)
+    updated_at = (now - timedelta(days=30)).replace(tzinfo=None)
+    assert decayed_weight(40.0, updated_at, now, 30 * DAY) == 20.0
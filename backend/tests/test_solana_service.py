@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import solana_service
+
+
+class StubClient:
+    def __init__(self, rpc_url, timeout=None):
+        self.calls = []
+        self.blockhashes = iter(["hash-1", "hash-2"])
+        self.send_value = "sig-1"
+
+    def get_latest_blockhash(self):
+        self.calls.append("get_latest_blockhash")
+        return SimpleNamespace(value=SimpleNamespace(blockhash=next(self.blockhashes)))
+
+    def send_transaction(self, tx, *signers, recent_blockhash=None):
+        self.calls.append(("send_transaction", recent_blockhash))
+        return SimpleNamespace(value=self.send_value)
+
+
+class StubTransaction:
+    def add(self, instruction):
+        return self
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(solana_service, "Client", StubClient)
+    monkeypatch.setattr(solana_service, "Transaction", StubTransaction)
+    monkeypatch.setattr(
+        solana_service, "Pubkey", SimpleNamespace(from_string=lambda value: value)
+    )
+    monkeypatch.setattr(solana_service, "Instruction", lambda **kwargs: kwargs)
+    monkeypatch.setattr(solana_service, "_load_keypair", lambda path: "keypair")
+    monkeypatch.setattr(solana_service, "_record_rpc_timing", lambda *args: None)
+    return solana_service.SolanaService("http://rpc", "key.json", blockhash_ttl_sec=60)
+
+
+def test_send_memo_returns_signature_and_reuses_blockhash(service):
+    assert service.send_memo("memo-1") == "sig-1"
+    assert service.send_memo("memo-2") == "sig-1"
+    assert service.client.calls == [
+        "get_latest_blockhash",
+        ("send_transaction", "hash-1"),
+        ("send_transaction", "hash-1"),
+    ]
+
+
+def test_send_memo_without_signature_refreshes_blockhash(service):
+    service.client.send_value = None
+    with pytest.raises(RuntimeError):
+        service.send_memo("memo")
+    service.client.send_value = "sig-2"
+    assert service.send_memo("memo") == "sig-2"
+    assert service.client.calls[-1] == ("send_transaction", "hash-2")
@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils.spatial_snapshot import PlaceSnapshot  # noqa: E402
+
+
+def row(place_id, lon, lat, status="approved", category="bar", upvotes=0):
+    return {
+        "_id": place_id,
+        "location": {"type": "Point", "coordinates": [lon, lat]},
+        "place_type": "current",
+        "category": category,
+        "status": status,
+        "upvote_count": upvotes,
+        "safety_score": upvotes * 2.0,
+    }
+
+
+@pytest.fixture
+def snapshot():
+    return PlaceSnapshot(
+        [
+            row("a3", -118.2437, 34.0522, upvotes=3),
+            row("a1", -118.2437, 34.0522, category="cafe", upvotes=1),
+            row("b0", -118.3617, 34.0900, status="pending"),
+            row("c0", -74.0060, 40.7128, upvotes=7),
+        ]
+    )
+
+
+def test_nearby_orders_by_distance_then_id(snapshot):
+    places, total = snapshot.nearby(34.0522, -118.2437, 50000, {}, limit=10)
+    assert [p["_id"] for p in places] == ["a1", "a3", "b0"]
+    assert total == 3
+    assert places[0]["distance_meters"] == 0
+    assert places[2]["distance_meters"] == pytest.approx(11600, rel=0.01)
+
+
+def test_nearby_filters_and_pages(snapshot):
+    query = {"status": "approved"}
+    first, total = snapshot.nearby(34.0522, -118.2437, 50000, query, limit=1)
+    assert total == 2
+    after = (first[0]["distance_meters"], first[0]["_id"])
+    rest, total = snapshot.nearby(34.0522, -118.2437, 50000, query, limit=1, after=after)
+    assert [p["_id"] for p in rest] == ["a3"]
+    assert total == 1
+    skipped, total = snapshot.nearby(34.0522, -118.2437, 50000, query, limit=1, offset=1)
+    assert skipped == rest
+    assert total == 2
+    _, capped = snapshot.nearby(34.0522, -118.2437, 50000, {}, limit=1, count_cap=2)
+    assert capped == 2
+
+
+def test_cursor_pages_split_ties_in_id_order():
+    tied = PlaceSnapshot(
+        [row(f"t{i}", -118.2437, 34.0622) for i in (3, 0, 4, 1, 2)]
+        + [row("z0", -118.2437, 34.0722)]
+    )
+    seen, after = [], None
+    while True:
+        page, _ = tied.nearby(34.0522, -118.2437, 10000, {}, limit=2, after=after)
+        if not page:
+            break
+        seen.extend(p["_id"] for p in page)
+        after = (page[-1]["distance_meters"], page[-1]["_id"])
+    assert seen == ["t0", "t1", "t2", "t3", "t4", "z0"]
+
+
+def test_within_bbox(snapshot):
+    places = snapshot.within_bbox(-119, 33, -118, 35, {"category": "bar"}, limit=10)
+    assert sorted(p["_id"] for p in places) == ["a3", "b0"]
+    assert snapshot.within_bbox(170, 33, -170, 35, {}, limit=10) == []
+
+
+def test_aggregates(snapshot):
+    assert snapshot.region_stats(34.0522, -118.2437, 50000) == (3, 4)
+    heat = snapshot.heatmap(34.0522, -118.2437, 50000, {"status": "approved"})
+    assert sorted(h[2] for h in heat) == [2.0, 6.0]
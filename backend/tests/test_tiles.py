@@ -0,0 +1,16 @@
+import pytest
+
+from utils.tiles import lonlat_to_world, world_to_lonlat, tile_bounds
+
+
+def test_world_round_trip():
+    x, y = lonlat_to_world(-118.2437, 34.0522)
+    lon, lat = world_to_lonlat(x, y)
+    assert lon == pytest.approx(-118.2437)
+    assert lat == pytest.approx(34.0522)
+
+
+def test_tile_bounds():
+    assert tile_bounds(0, 0, 0) == pytest.approx((-180, -85.0511287798, 180, 85.0511287798))
+    west, south, east, north = tile_bounds(1, 1, 0)
+    assert (west, south, east) == pytest.approx((0, 0, 180))
@@ -0,0 +1,182 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from flask import Flask, current_app
+from pymongo import ReturnDocument
+
+from services import upvotes
+
+
+@pytest.fixture
+def app_context(redis_client, monkeypatch):
+    monkeypatch.setattr(upvotes, "bump_places_version", lambda: None)
+    app = Flask(__name__)
+    app.config.update(UPVOTE_WRITE_BEHIND=True, SAFETY_SCORE_HALF_LIFE_DAYS=0)
+    with app.app_context():
+        yield
+
+
+def flushing(redis_client, flush_id, **deltas):
+    mapping = {upvotes._FLUSH_ID_FIELD: flush_id, **deltas}
+    redis_client.hset(upvotes.UPVOTES_FLUSHING_KEY, mapping=mapping)
+
+
+def test_reads_add_pending_and_flushing_deltas(redis_client, app_context):
+    place_id = ObjectId()
+    redis_client.hset(upvotes.UPVOTES_PENDING_KEY, str(place_id), 2)
+    flushing(redis_client, "f1", **{str(place_id): 3})
+
+    [row] = upvotes.refresh_scores([{"_id": place_id, "upvote_count": 10}])
+    assert row["upvote_count"] == 15
+
+
+def test_reads_skip_a_flush_the_document_already_took(redis_client, app_context):
+    # The flush has written to Mongo but not yet deleted its hash.
+    applied, waiting = ObjectId(), ObjectId()
+    redis_client.hset(upvotes.UPVOTES_PENDING_KEY, str(applied), 1)
+    flushing(redis_client, "f1", **{str(applied): 3, str(waiting): 4})
+
+    rows = upvotes.refresh_scores(
+        [
+            {"_id": applied, "upvote_count": 13, "upvote_flush_id": "f1"},
+            {"_id": waiting, "upvote_count": 10, "upvote_flush_id": "f0"},
+        ]
+    )
+    assert [row["upvote_count"] for row in rows] == [14, 14]
+
+
+def test_upvote_response_skips_an_applied_flush(redis_client, app_context):
+    place_id = ObjectId()
+    flushing(redis_client, "f1", **{str(place_id): 3})
+    row = {"_id": place_id, "upvote_flush_id": "f1"}
+    assert upvotes.record_upvote(row) == 1
+    assert upvotes.record_upvote({"_id": place_id}) == 5
+
+
+@pytest.fixture
+def flushed_place(places, app_context, monkeypatch):
+    grid = []
+
+    def record_upvotes(rows, flush_id):
+        grid.append((list(rows), flush_id))
+
+    monkeypatch.setattr(upvotes, "record_upvotes", record_upvotes)
+    place_id = places.insert_one(
+        {
+            "name": "Place",
+            "location": {"type": "Point", "coordinates": [-118.38, 34.09]},
+            "status": "approved",
+            "upvote_count": 10,
+        }
+    ).inserted_id
+    return place_id, grid
+
+
+def test_flush_applies_pending_deltas_once(places, redis_client, flushed_place):
+    place_id, grid = flushed_place
+    for _ in range(3):
+        upvotes.record_upvote({"_id": place_id})
+
+    assert upvotes.flush_pending_upvotes() == 1
+    place = places.find_one({"_id": place_id})
+    assert place["upvote_count"] == 13
+    assert grid[0][0] == [([-118.38, 34.09], "approved", 3)]
+    assert not redis_client.exists(upvotes.UPVOTES_FLUSHING_KEY)
+    assert upvotes.flush_pending_upvotes() == 0
+
+
+def test_flush_retried_after_a_crash_reuses_its_id(
+    places, redis_client, flushed_place, monkeypatch
+):
+    place_id, grid = flushed_place
+    upvotes.record_upvote({"_id": place_id})
+    upvotes.record_upvote({"_id": place_id})
+
+    def crash(rows, flush_id):
+        raise RuntimeError("died after the Mongo write")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(upvotes, "record_upvotes", crash)
+        with pytest.raises(RuntimeError):
+            upvotes.flush_pending_upvotes()
+    place = places.find_one({"_id": place_id})
+    assert place["upvote_count"] == 12
+    # Readers in between see 12, not 12 plus the still-present flushing delta.
+    assert upvotes.refresh_scores([place])[0]["upvote_count"] == 12
+
+    upvotes.record_upvote({"_id": place_id})  # lands in a fresh pending hash
+    upvotes.flush_pending_upvotes()
+    place = places.find_one({"_id": place_id})
+    assert place["upvote_count"] == 12
+    assert grid[0][1] == place["upvote_flush_id"]
+    assert upvotes.refresh_scores([place])[0]["upvote_count"] == 13
+
+    upvotes.flush_pending_upvotes()
+    assert places.find_one({"_id": place_id})["upvote_count"] == 13
+
+
+def test_upvote_route_applies_and_returns_one_atomic_update(client, places):
+    place_id = places.insert_one(
+        {
+            "name": "Place",
+            "location": {"type": "Point", "coordinates": [-118.38, 34.09]},
+            "place_type": "current",
+            "category": "bar",
+            "transaction_id": str(ObjectId()),
+            "status": "approved",
+            "upvote_count": 4,
+        }
+    ).inserted_id
+
+    response = client.post(
+        f"/v1/places/{place_id}/upvote", headers={"X-Client-Fingerprint": "fp-1"}
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["new_upvote_count"] == 5
+    assert body["new_safety_score"] == upvotes.compute_place_safety_score(5)
+    assert body["transaction_id"].startswith("pending:")
+    place = places.find_one({"_id": place_id})
+    assert place["upvote_count"] == 5
+    assert place["safety_score"] == body["new_safety_score"]
+    assert place["indexed_at"]
+    places.database.anchor_outbox.delete_many({})
+    places.database.safety_cells.delete_many({})
+
+
+def test_concurrent_upvotes_are_not_lost(places, app_context):
+    place_id = places.insert_one({"name": "Place", "upvote_count": 0}).inserted_id
+    pipeline = upvotes.upvote_pipeline()
+
+    def upvote():
+        places.find_one_and_update({"_id": place_id}, pipeline)
+
+    threads = [threading.Thread(target=upvote) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    place = places.find_one({"_id": place_id})
+    assert place["upvote_count"] == 20
+    assert place["safety_score"] == upvotes.compute_place_safety_score(20)
+
+
+def test_upvote_decays_the_stored_weight_before_adding(places, app_context):
+    current_app.config["SAFETY_SCORE_HALF_LIFE_DAYS"] = 30
+    month_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    place_id = places.insert_one(
+        {"upvote_count": 10, "upvote_weight": 10.0, "upvote_weight_at": month_ago}
+    ).inserted_id
+
+    place = places.find_one_and_update(
+        {"_id": place_id},
+        upvotes.upvote_pipeline(),
+        return_document=ReturnDocument.AFTER,
+    )
+    assert place["upvote_count"] == 11
+    assert place["upvote_weight"] == pytest.approx(6.0, abs=0.01)
+    assert place["safety_score"] == pytest.approx(
+        upvotes.compute_place_safety_score(place["upvote_weight"])
+    )
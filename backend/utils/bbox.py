@@ -0,0 +1,93 @@
+import math
+
+# Web Mercator cannot show anything beyond this latitude, and clamping keeps
+# polygon rings away from the poles, where their vertices would collapse.
+MAX_LAT = 85.0511
+
+# 2dsphere polygons must stay well under a hemisphere, so wide boxes are split
+# into slices no wider than this.
+MAX_SLICE_DEG = 90.0
+
+# Polygon edges are great-circle arcs; extra vertices along the north and
+# south edges keep them close to the parallels a map viewport actually shows.
+EDGE_STEP_DEG = 1.0
+
+
+# Same sphere MongoDB uses for spherical $geoNear.
+EARTH_RADIUS_METERS = 6378.1 * 1000
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def radius_bbox(lat, lon, radius):
+    """(west, south, east, north) enclosing a circle of radius meters.
+
+    west > east when the box crosses the antimeridian.
+    """
+    dlat = radius / _METERS_PER_DEGREE
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if dlon >= 180:
+        return -180.0, south, 180.0, north
+    west = (lon - dlon + 180) % 360 - 180
+    east = (lon + dlon + 180) % 360 - 180
+    return west, south, east, north
+
+
+def parse_bbox(args):
+    """Read west/south/east/north from query args. Returns (bbox, error)."""
+    try:
+        west, south, east, north = (
+            float(args.get(name)) for name in ("west", "south", "east", "north")
+        )
+    except (TypeError, ValueError):
+        return None, "west, south, east and north required"
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        return None, "west and east must be between -180 and 180"
+    if not (-90 <= south <= 90 and -90 <= north <= 90):
+        return None, "south and north must be between -90 and 90"
+    if south >= north:
+        return None, "south must be less than north"
+    if west == east:
+        return None, "west and east must differ"
+    return (west, south, east, north), None
+
+
+def parse_bbox_string(value):
+    """Parse a bbox=west,south,east,north parameter. Returns (bbox, error)."""
+    parts = (value or "").split(",")
+    if len(parts) != 4:
+        return None, "bbox must be west,south,east,north"
+    return parse_bbox(dict(zip(("west", "south", "east", "north"), parts)))
+
+
+def bbox_polygons(west, south, east, north):
+    """GeoJSON polygons covering a viewport for $geoWithin.
+
+    A west greater than east means the box crosses the antimeridian.
+    """
+    south = max(south, -MAX_LAT)
+    north = min(north, MAX_LAT)
+    width = (east - west) % 360 or 360
+    slices = max(1, int(-(-width // MAX_SLICE_DEG)))
+    step = width / slices
+    polygons = []
+    for i in range(slices):
+        lo = west + i * step
+        polygons.append(_box_polygon(lo, south, lo + step, north))
+    return polygons
+
+
+def _box_polygon(west, south, east, north):
+    count = max(1, int(-(-(east - west) // EDGE_STEP_DEG)))
+    lons = [west + (east - west) * i / count for i in range(count + 1)]
+    ring = [[_wrap(lon), south] for lon in lons]
+    ring += [[_wrap(lon), north] for lon in reversed(lons)]
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def _wrap(lon):
+    """Fold a longitude back into [-180, 180]."""
+    if lon > 180:
+        return lon - 360
+    return lon
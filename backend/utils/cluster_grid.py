@@ -0,0 +1,120 @@
+import heapq
+
+from utils.tiles import lonlat_to_world
+
+
+# Deepest zoom with its own level; higher zooms reuse it.
+MAX_ZOOM = 20
+
+# A cluster cell is a 1/4 of a 256px tile edge, so about 64px on screen at
+# every zoom. Cluster counts then scale with the viewport, not the data.
+CELL_BITS = 2
+
+
+class _Cell:
+    __slots__ = ("sum_lon", "sum_lat", "members")
+
+    def __init__(self):
+        self.sum_lon = 0.0
+        self.sum_lat = 0.0
+        self.members = {}
+
+
+class ClusterGrid:
+    """Hierarchical Web Mercator grid of points, one level per zoom.
+
+    Each point sits in exactly one cell per level, and a cell at zoom z is the
+    union of its four children at z + 1, so upsert and remove touch one cell
+    per level and never require a rebuild.
+    """
+
+    def __init__(self, max_zoom=MAX_ZOOM):
+        self.max_zoom = max_zoom
+        self._levels = [{} for _ in range(max_zoom + 1)]
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, point_id):
+        return point_id in self._points
+
+    def upsert(self, point_id, lon, lat, weight=0):
+        """Add a point or move it; weight ranks cluster representatives."""
+        self.remove(point_id)
+        x, y = lonlat_to_world(lon, lat)
+        scale = 1 << (self.max_zoom + CELL_BITS)
+        leaf = (int(x * scale), int(y * scale))
+        self._points[point_id] = (lon, lat, leaf)
+        for key, cells in self._cells_for(leaf):
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = _Cell()
+            cell.sum_lon += lon
+            cell.sum_lat += lat
+            cell.members[point_id] = weight
+
+    def remove(self, point_id):
+        point = self._points.pop(point_id, None)
+        if point is None:
+            return False
+        lon, lat, leaf = point
+        for key, cells in self._cells_for(leaf):
+            cell = cells[key]
+            del cell.members[point_id]
+            if not cell.members:
+                del cells[key]
+                continue
+            cell.sum_lon -= lon
+            cell.sum_lat -= lat
+        return True
+
+    def clusters(self, zoom, west, south, east, north, limit, representatives=3):
+        """Clusters overlapping a bbox at a zoom. Returns (clusters, truncated).
+
+        When more than limit cells are occupied the biggest clusters win.
+        """
+        zoom = max(0, min(int(zoom), self.max_zoom))
+        side = 1 << (zoom + CELL_BITS)
+        x0, y0 = lonlat_to_world(west, north)
+        x1, y1 = lonlat_to_world(east, south)
+        cx0, cx1 = int(x0 * side), int(x1 * side)
+        cy0, cy1 = int(y0 * side), int(y1 * side)
+        wraps = west > east
+
+        matched = []
+        for (cx, cy), cell in self._levels[zoom].items():
+            if not cy0 <= cy <= cy1:
+                continue
+            if wraps:
+                if cx1 < cx < cx0:
+                    continue
+            elif not cx0 <= cx <= cx1:
+                continue
+            matched.append((cx, cy, cell))
+
+        truncated = len(matched) > limit
+        if truncated:
+            matched = heapq.nlargest(limit, matched, key=lambda m: len(m[2].members))
+
+        clusters = []
+        for cx, cy, cell in matched:
+            count = len(cell.members)
+            top = heapq.nlargest(
+                representatives, cell.members.items(), key=lambda m: m[1]
+            )
+            clusters.append(
+                {
+                    "id": f"{zoom}/{cx}/{cy}",
+                    "lon": cell.sum_lon / count,
+                    "lat": cell.sum_lat / count,
+                    "count": count,
+                    "place_ids": [point_id for point_id, _ in top],
+                }
+            )
+        return clusters, truncated
+
+    def _cells_for(self, leaf):
+        for zoom, cells in enumerate(self._levels):
+            shift = self.max_zoom - zoom
+            yield (leaf[0] >> shift, leaf[1] >> shift), cells
@@ -0,0 +1,70 @@
+import base64
+import sys
+from array import array
+
+from utils.validation import ALLOWED_CATEGORIES
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover
+    msgpack = None
+
+
+MSGPACK_MIMETYPE = "application/x-msgpack"
+JSON_MIMETYPE = "application/json"
+
+ALLOWED_FORMATS = {"json", "columnar"}
+
+# Position in this tuple is the category's code in columnar responses.
+CATEGORY_CODES = tuple(sorted(ALLOWED_CATEGORIES))
+_CATEGORY_INDEX = {name: code for code, name in enumerate(CATEGORY_CODES)}
+
+# Fields a columnar place list needs; passed as fields= to narrow projections.
+COLUMNAR_FIELDS = ("location", "safety_score", "category")
+
+
+def response_format(request):
+    """Pick "json", "columnar" or "msgpack" for a request.
+
+    msgpack is chosen when the client prefers it in Accept (and msgpack is
+    installed) and is always columnar; otherwise format= decides.
+    """
+    if msgpack is not None:
+        best = request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE])
+        if best == MSGPACK_MIMETYPE:
+            return "msgpack"
+    return request.args.get("format", "json")
+
+
+def place_columns(raw_places):
+    """Column arrays for projected place rows; unknown categories code to -1."""
+    columns = {"ids": [], "lons": [], "lats": [], "scores": [], "categories": []}
+    for raw in raw_places:
+        lon, lat = raw["location"]["coordinates"]
+        columns["ids"].append(str(raw["_id"]))
+        columns["lons"].append(lon)
+        columns["lats"].append(lat)
+        columns["scores"].append(raw.get("safety_score", 0))
+        columns["categories"].append(_CATEGORY_INDEX.get(raw.get("category"), -1))
+    columns["category_codes"] = list(CATEGORY_CODES)
+    return columns
+
+
+def pack_float32(rows):
+    """Flatten rows of numbers into a little-endian Float32 buffer."""
+    buffer = array("f", (value for row in rows for value in row))
+    if sys.byteorder == "big":
+        buffer.byteswap()
+    return buffer.tobytes()
+
+
+def packed_points(rows, stride, output):
+    """Payload for a packed point buffer; base64 in JSON, raw bytes in msgpack."""
+    points = pack_float32(rows)
+    if output != "msgpack":
+        points = base64.b64encode(points).decode("ascii")
+    return {"count": len(rows), "stride": stride, "points": points}
+
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload, use_bin_type=True)
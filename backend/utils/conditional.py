@@ -0,0 +1,24 @@
+import hashlib
+
+from flask import current_app, request
+
+
+def make_etag(*parts):
+    """Strong ETag value from whatever identifies a representation."""
+    raw = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def with_caching_headers(response, etag=None):
+    if etag:
+        response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["PLACES_MAX_AGE_SEC"]
+    return response
+
+
+def not_modified(etag):
+    """A 304 when If-None-Match already names etag, otherwise None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return with_caching_headers(current_app.response_class(status=304), etag)
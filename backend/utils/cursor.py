@@ -0,0 +1,21 @@
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Pack a dict of JSON-safe values into an opaque, URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Reverse encode_cursor. Raises ValueError for anything malformed."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("cursor is malformed") from exc
+    if not isinstance(values, dict):
+        raise ValueError("cursor is malformed")
+    return values
@@ -0,0 +1,103 @@
+import math
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode(lat, lon, precision):
+    """Standard base32 geohash of a point."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = (value << 1) | 1
+                lon_lo = mid
+            else:
+                value <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """Return (south, west, north, east) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def decode(geohash):
+    """Return the (lat, lon) center of a geohash cell."""
+    south, west, north, east = bounds(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) spanned by a cell at this precision."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering(south, west, north, east, precision):
+    """Geohashes of every cell at precision that touches the bbox.
+
+    west > east means the box crosses the antimeridian.
+    """
+    lat_step, lon_step = cell_size(precision)
+    if west > east:
+        east += 360.0
+    south, north = max(south, -90.0), min(north, 90.0)
+    cells = []
+    first_row = math.floor((south + 90.0) / lat_step)
+    last_row = min(math.floor((north + 90.0) / lat_step), round(180.0 / lat_step) - 1)
+    first_col = math.floor((west + 180.0) / lon_step)
+    last_col = math.floor((east + 180.0) / lon_step)
+    columns = round(360.0 / lon_step)
+    for row in range(first_row, last_row + 1):
+        lat = -90.0 + (row + 0.5) * lat_step
+        seen = set()
+        for col in range(first_col, last_col + 1):
+            col %= columns
+            if col in seen:
+                break
+            seen.add(col)
+            cells.append(encode(lat, -180.0 + (col + 0.5) * lon_step, precision))
+    return cells
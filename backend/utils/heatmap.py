@@ -0,0 +1,61 @@
+from utils.tiles import lonlat_to_world, world_to_lonlat
+
+
+TILE_SIZE_PX = 256
+
+# Cell sizes divide the tile size, so every cell lies inside exactly one tile
+# and a tile's cells can be computed (and cached) on their own.
+ALLOWED_CELL_PX = {8, 16, 32, 64, 128, 256}
+DEFAULT_CELL_PX = 32
+
+MAX_HEATMAP_ZOOM = 22
+
+# Most grid cells one binned heatmap response may span; roughly a 4K screen
+# of 32px cells.
+MAX_HEATMAP_CELLS = 8192
+
+
+def _cells_per_side(zoom, cell_px):
+    return (TILE_SIZE_PX << zoom) // cell_px
+
+
+def cell_count(west, south, east, north, zoom, cell_px):
+    """Number of grid cells a bbox spans; west > east crosses the antimeridian."""
+    cells = _cells_per_side(zoom, cell_px)
+    x0, y0 = lonlat_to_world(west, north)
+    x1, y1 = lonlat_to_world(east, south)
+    columns = (int(x1 * cells) - int(x0 * cells)) % cells + 1
+    rows = int(y1 * cells) - int(y0 * cells) + 1
+    return columns * rows
+
+
+def bin_points(points, zoom, cell_px):
+    """Aggregate [lon, lat, score] points into screen-space grid cells.
+
+    Returns [lon, lat, total_score, count] per non-empty cell, positioned at
+    the cell's center and ordered row by row, so the output never has more
+    entries than the viewport has cells.
+    """
+    cells = _cells_per_side(zoom, cell_px)
+    bins = {}
+    for lon, lat, score in points:
+        wx, wy = lonlat_to_world(lon, lat)
+        key = (int(wy * cells), int(wx * cells))
+        total = bins.get(key)
+        if total is None:
+            bins[key] = [score or 0, 1]
+        else:
+            total[0] += score or 0
+            total[1] += 1
+    binned = []
+    for (row, column), (score, count) in sorted(bins.items()):
+        lon, lat = world_to_lonlat((column + 0.5) / cells, (row + 0.5) / cells)
+        binned.append([lon, lat, score, count])
+    return binned
+
+
+def in_tile(lon, lat, z, x, y):
+    """Whether a point falls inside tile z/x/y (west and north edges inclusive)."""
+    n = 1 << z
+    wx, wy = lonlat_to_world(lon, lat)
+    return int(wx * n) == x and int(wy * n) == y
@@ -0,0 +1,60 @@
+import hashlib
+
+
+# Leaves and inner nodes are hashed with different prefixes so an inner node
+# can never be passed off as a leaf (second-preimage protection).
+_LEAF = b"\x00"
+_NODE = b"\x01"
+
+
+def leaf_hash(data):
+    """Hash of one action (its memo string) as a tree leaf, hex encoded."""
+    return hashlib.sha256(_LEAF + data.encode("utf-8")).hexdigest()
+
+
+def _node_hash(left, right):
+    raw = _NODE + bytes.fromhex(left) + bytes.fromhex(right)
+    return hashlib.sha256(raw).hexdigest()
+
+
+def merkle_tree(items):
+    """Return (root, proofs) for a non-empty list of strings.
+
+    proofs[i] lists the sibling hashes from item i up to the root as
+    {"side": "left"|"right", "hash": hex}. A node without a sibling is
+    carried up to the next level unchanged.
+    """
+    if not items:
+        raise ValueError("merkle tree needs at least one item")
+    level = [leaf_hash(item) for item in items]
+    positions = list(range(len(items)))
+    proofs = [[] for _ in items]
+    while len(level) > 1:
+        for i, pos in enumerate(positions):
+            sibling = pos ^ 1
+            if sibling < len(level):
+                side = "left" if sibling < pos else "right"
+                proofs[i].append({"side": side, "hash": level[sibling]})
+            positions[i] = pos // 2
+        level = [
+            _node_hash(level[j], level[j + 1]) if j + 1 < len(level) else level[j]
+            for j in range(0, len(level), 2)
+        ]
+    return level[0], proofs
+
+
+def root_from_proof(item, proof):
+    """Recompute the root an item's proof leads to. Raises ValueError if malformed."""
+    node = leaf_hash(item)
+    for step in proof:
+        try:
+            side, sibling = step["side"], step["hash"]
+            if side == "left":
+                node = _node_hash(sibling, node)
+            elif side == "right":
+                node = _node_hash(node, sibling)
+            else:
+                raise ValueError("proof side must be left or right")
+        except (KeyError, TypeError) as exc:
+            raise ValueError("proof is malformed") from exc
+    return node
@@ -0,0 +1,84 @@
+import struct
+
+
+EXTENT = 4096
+
+_VARINT = 0
+_FIXED64 = 1
+_BYTES = 2
+
+_POINT = 1
+_MOVE_TO_ONE = (1 & 0x7) | (1 << 3)
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field, payload):
+    return _key(field, _BYTES) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    if isinstance(value, str):
+        return _bytes_field(1, value.encode("utf-8"))
+    if isinstance(value, bool):
+        return _key(7, _VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        return _key(6, _VARINT) + _varint(_zigzag(value))
+    return _key(3, _FIXED64) + struct.pack("<d", float(value))
+
+
+def encode_point_layer(name, features, extent=EXTENT):
+    """Encode one point layer as a complete Mapbox Vector Tile (spec 2.1).
+
+    features is an iterable of (x, y, properties) with x/y already in tile
+    pixel space (0..extent, may overshoot into the buffer). None-valued
+    properties are left out, and keys and values are shared across features
+    as the spec intends.
+    """
+    keys = {}
+    values = {}
+    encoded_features = []
+    for x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        geometry = [_MOVE_TO_ONE, _zigzag(int(round(x))), _zigzag(int(round(y)))]
+        feature = (
+            _packed(2, tags)
+            + _key(3, _VARINT)
+            + _varint(_POINT)
+            + _packed(4, geometry)
+        )
+        encoded_features.append(_bytes_field(2, feature))
+
+    if not encoded_features:
+        return b""
+
+    layer = _key(15, _VARINT) + _varint(2) + _bytes_field(1, name.encode("utf-8"))
+    layer += b"".join(encoded_features)
+    layer += b"".join(_bytes_field(3, k.encode("utf-8")) for k in keys)
+    layer += b"".join(_bytes_field(4, _encode_value(v)) for _, v in values)
+    layer += _key(5, _VARINT) + _varint(extent)
+    return _bytes_field(3, layer)
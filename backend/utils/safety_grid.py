@@ -0,0 +1,57 @@
+import math
+
+from utils.bbox import EARTH_RADIUS_METERS, radius_bbox
+from utils.geohash import cell_size, covering, decode, encode
+
+
+# Geohash precisions the safety grid keeps: ~39km cells at 4 down to ~150m at 7.
+GRID_PRECISIONS = (4, 5, 6, 7)
+
+# Most cells one region query sums; bigger radii use coarser cells.
+MAX_COVER_CELLS = 1024
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def grid_precision(lat, radius):
+    """Finest grid precision whose covering of the radius stays under the cap."""
+    west, south, east, north = radius_bbox(lat, 0.0, radius)
+    height = north - south
+    width = (east - west) % 360 or 360
+    for precision in reversed(GRID_PRECISIONS):
+        lat_step, lon_step = cell_size(precision)
+        cells = (height / lat_step + 1) * (width / lon_step + 1)
+        if cells <= MAX_COVER_CELLS:
+            return precision
+    return GRID_PRECISIONS[0]
+
+
+def cells_in_radius(lat, lon, radius, precision):
+    """Geohashes at precision whose centers lie within radius meters.
+
+    Counting a cell by its center is what makes grid answers approximate:
+    places near the edge of the circle can be in or out by up to a cell.
+    The cell holding the query point always counts, so a radius smaller
+    than a cell never comes back empty.
+    """
+    west, south, east, north = radius_bbox(lat, lon, radius)
+    center = encode(lat, lon, precision)
+    cells = [
+        cell
+        for cell in covering(south, west, north, east, precision)
+        if cell != center and _distance(lat, lon, *decode(cell)) <= radius
+    ]
+    return [center] + cells
+
+
+def place_cells(lat, lon):
+    """The grid cell holding a point at every grid precision."""
+    finest = encode(lat, lon, GRID_PRECISIONS[-1])
+    return [finest[:precision] for precision in GRID_PRECISIONS]
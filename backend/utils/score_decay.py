@@ -0,0 +1,19 @@
+from datetime import timezone
+
+
+def decay_factor(elapsed_sec, half_life_sec):
+    """Share of a weight left after elapsed_sec; no decay if half_life_sec <= 0."""
+    if half_life_sec <= 0 or elapsed_sec <= 0:
+        return 1.0
+    return 0.5 ** (elapsed_sec / half_life_sec)
+
+
+def decayed_weight(weight, updated_at, now, half_life_sec):
+    """weight as of now, given it was exact at updated_at.
+
+    Naive datetimes are taken as UTC, which is how pymongo returns them.
+    """
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    elapsed = (now - updated_at).total_seconds()
+    return weight * decay_factor(elapsed, half_life_sec)
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+# Same sphere MongoDB uses for spherical $geoNear, so distances (and cursors
+# built from them) agree whichever path answered the query.
+EARTH_RADIUS_METERS = 6378.1 * 1000
+
+_METERS_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_METERS / 180
+
+FILTER_FIELDS = ("place_type", "category", "status")
+
+
+class PlaceSnapshot:
+    """Read-only, in-memory copy of place summaries for spatial queries.
+
+    Rows are sorted by latitude, so a radius query first narrows to the
+    latitude band with a binary search and only computes haversine distances
+    inside it. Filters are plain equality masks over column arrays.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: r["location"]["coordinates"][1])
+        self.rows = rows
+        coords = np.array(
+            [r["location"]["coordinates"] for r in rows], dtype=float
+        ).reshape(-1, 2)
+        self.lon = coords[:, 0]
+        self.lat = coords[:, 1]
+        self.ids = np.array([str(r["_id"]) for r in rows], dtype=str)
+        self.upvotes = np.array(
+            [r.get("upvote_count") or 0 for r in rows], dtype=float
+        )
+        self.safety = np.array(
+            [r.get("safety_score") or 0 for r in rows], dtype=float
+        )
+        self.columns = {
+            name: np.array([r.get(name) for r in rows], dtype=object)
+            for name in FILTER_FIELDS
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _mask(self, query, index):
+        mask = np.ones(len(index), dtype=bool)
+        for name, value in (query or {}).items():
+            mask &= self.columns[name][index] == value
+        return mask
+
+    def _within_radius(self, lat, lon, radius):
+        """Indices and distances of rows within radius meters of a point."""
+        band = radius / _METERS_PER_DEGREE_LAT
+        lo = np.searchsorted(self.lat, lat - band, side="left")
+        hi = np.searchsorted(self.lat, lat + band, side="right")
+        index = np.arange(lo, hi)
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2, lon2 = np.radians(self.lat[index]), np.radians(self.lon[index])
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        distance = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        keep = distance <= radius
+        return index[keep], distance[keep]
+
+    def nearby(
+        self, lat, lon, radius, query, limit, offset=0, after=None, count_cap=None
+    ):
+        """$geoNear equivalent. Returns (rows with distance_meters, total).
+
+        Rows are ordered by (distance, id). after=(distance, id) resumes past a
+        cursor exactly like the Mongo path; total counts what is left after
+        it, stopping at count_cap when one is given.
+        """
+        index, distance = self._within_radius(lat, lon, radius)
+        keep = self._mask(query, index)
+        index, distance = index[keep], distance[keep]
+        order = np.lexsort((self.ids[index], distance))
+        index, distance = index[order], distance[order]
+        if after:
+            last_distance, last_id = after
+            last_id = str(last_id)
+            ids = self.ids[index]
+            keep = (distance > last_distance) | (
+                (distance == last_distance) & (ids > last_id)
+            )
+            index, distance = index[keep], distance[keep]
+        # Counted before offset is applied, as $skip only runs in the page
+        # branch of the Mongo path's $facet.
+        total = len(index) if count_cap is None else min(len(index), count_cap)
+        if not after:
+            index, distance = index[offset:], distance[offset:]
+        page = [
+            dict(self.rows[i], distance_meters=float(d))
+            for i, d in zip(index[:limit], distance[:limit])
+        ]
+        return page, total
+
+    def within_bbox(self, west, south, east, north, query, limit):
+        """Rows inside a bbox, in no particular order."""
+        lo = np.searchsorted(self.lat, south, side="left")
+        hi = np.searchsorted(self.lat, north, side="right")
+        index = np.arange(lo, hi)
+        lon = self.lon[index]
+        if west <= east:
+            inside = (lon >= west) & (lon <= east)
+        else:
+            inside = (lon >= west) | (lon <= east)
+        index = index[inside]
+        index = index[self._mask(query, index)]
+        return [dict(self.rows[i]) for i in index[:limit]]
+
+    def region_stats(self, lat, lon, radius, query=None):
+        """Count and upvote total of matching rows within radius."""
+        index, _ = self._within_radius(lat, lon, radius)
+        index = index[self._mask(query, index)]
+        return len(index), int(self.upvotes[index].sum())
+
+    def heatmap(self, lat, lon, radius, query=None):
+        """[lon, lat, safety_score] triples for matching rows within radius."""
+        index, distance = self._within_radius(lat, lon, radius)
+        keep = self._mask(query, index)
+        index = index[keep][np.argsort(distance[keep], kind="stable")]
+        return [
+            [float(self.lon[i]), float(self.lat[i]), float(self.safety[i])]
+            for i in index
+        ]
@@ -0,0 +1,30 @@
+import math
+
+
+# Latitude where Web Mercator's square world ends.
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def lonlat_to_world(lon, lat):
+    """Project a point to Web Mercator world coordinates in [0, 1)."""
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    top = math.nextafter(1.0, 0.0)
+    return min(max(x, 0.0), top), min(max(y, 0.0), top)
+
+
+def world_to_lonlat(x, y):
+    """Inverse of lonlat_to_world."""
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lon, lat
+
+
+def tile_bounds(z, x, y):
+    """Return (west, south, east, north) of an XYZ tile."""
+    n = 1 << z
+    west, north = world_to_lonlat(x / n, y / n)
+    east, south = world_to_lonlat((x + 1) / n, (y + 1) / n)
+    return west, south, east, north
@@ -10,6 +10,13 @@ ALLOWED_CATEGORIES = {
     "other",
 }
 ALLOWED_STATUS = {"pending", "approved", "rejected"}
+ALLOWED_TOTAL_MODES = {"none", "estimate", "exact"}
+ALLOWED_SAFETY_MODES = {"grid", "exact"}
+ALLOWED_SUMMARY_FIELDS = {
+    "id", "transaction_id", "name", "location", "place_type", "category",
+    "safety_score", "upvote_count", "distance_meters", "status",
+    "created_at", "movements", "significance", "still_exists",
+}
 
 ALLOWED_MOVEMENTS = {
     "stonewall", "aids_activism", "marriage_equality", "trans_rights",
@@ -0,0 +1,19 @@
+"""Anchor queued submission and upvote memos on Solana: python worker.py
+
+With UPVOTE_WRITE_BEHIND on, this also flushes Redis upvote counters to Mongo.
+"""
+
+import threading
+
+from app import app
+from migrate import migrate
+from services.anchoring import run_worker
+from services.upvotes import run_flusher
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrate()
+    if app.config["UPVOTE_WRITE_BEHIND"]:
+        threading.Thread(target=run_flusher, args=(app,), daemon=True).start()
+    run_worker(app)